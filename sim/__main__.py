@@ -0,0 +1,5 @@
+# python sim [--root DIR] ... : run cpy_shell under CPython, see cpysim.py
+
+import cpysim
+
+cpysim.main()
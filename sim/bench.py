@@ -0,0 +1,190 @@
+# bench.py
+
+__version__ = '1.0.20240626'  # Major.Minor.Patch
+
+# Created by Chris Drake.
+# Linux-like shell interface for CircuitPython.  https://github.com/gitcnd/cpy_shell
+#
+# Benchmarks for the shell's hot paths, run in the simulator against a throw-away sandbox.
+#
+#   python sim/bench.py [--quick] [-k NAME] [-o FILE] [--compare BASE.jsonl [--threshold 1.25]]
+#
+# Output is JSON lines: a {"meta": ...} record, then one record per case
+#   {"name": "cat", "size": 1048576, "reps": 12, "min_us": ..., "median_us": ...}
+# Keep the output of a release and --compare a later run against it: cases whose min_us grew by
+# more than the threshold are listed on stderr and the exit status is 1.
+# Absolute numbers are CPython ones; the ratios between sizes and between releases are what matter.
+
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import cpysim
+
+KB = 1024
+MB = 1024 * 1024
+
+LINES = [  # what gets parsed, from trivial to everything at once
+    ('simple', 'ls'),
+    ('switches', 'ls -l -a --sort=size /lib'),
+    ('quotes', 'echo "hello world" \'$HOME\' a\\ b'),
+    ('env', 'echo $HOSTNAME ${HOSTNAME} $NOPE'),
+    ('pipes', 'cat /a.txt | grep -i foo | sort -r | wc -l > /out.txt'),
+]
+
+
+def _sink():
+    # stands in for print while a case runs: formats the way print does, then throws it away
+    null = io.StringIO()
+
+    def sink(*args, sep=' ', end='\n', file=None, flush=False):
+        null.write(sep.join(map(str, args)) + end)
+        null.seek(0)
+        null.truncate()
+    return sink
+
+
+def measure(fn, budget=0.3, most=10000):
+    # run fn until budget seconds are used up (at least 3 times unless one run takes longer than the budget)
+    fn()  # warm up: imports, file cache
+    times = []
+    end = time.perf_counter() + budget
+    while len(times) < most:
+        t = time.perf_counter_ns()
+        fn()
+        times.append(time.perf_counter_ns() - t)
+        if time.perf_counter() > end and (len(times) >= 3 or times[0] > budget * 1e9):
+            break
+    times.sort()
+    return {'reps': len(times), 'min_us': round(times[0] / 1000, 2), 'median_us': round(times[len(times) // 2] / 1000, 2)}
+
+
+def _file(path, size):
+    line = b'the quick brown fox jumps over the lazy dog 0123456789\n'
+    with open(path, 'wb') as f:
+        for _ in range(size // len(line)):
+            f.write(line)
+        f.write(line[:size % len(line)])
+
+
+def _history(path, n):
+    cmds = ['ls -l', 'cd /lib', 'cat /settings.toml', 'echo hello > /x', 'df', 'grep -i foo /a.txt', 'curl http://example.com/']
+    t = 1718841600
+    with open(path, 'w') as f:
+        f.write(f'{t}\tfirst-command-ever\n')
+        for i in range(1, n):
+            f.write(f'{t + i}\t{cmds[i % len(cmds)]} {i}\n')
+
+
+def cases(sb, shell, cio, quick):
+    # yields (name, size, fn); everything a case needs on "flash" is made here, just before it runs
+    real = sb.real
+    for tag, line in LINES:
+        yield 'parse_command_line:' + tag, len(line), lambda line=line: shell.parse_command_line(line)
+
+    for mod, cmd in (('sh0', 'pwd'), ('sh1', 'alias'), ('sh2', 'uptime'), ('none', 'nosuchcmd')):
+        yield 'execute_command:' + mod, 0, lambda cmd=cmd: shell.execute_command(cmd)
+
+    with open(real('/lib/sh.txt')) as f:
+        last = [l.split('\t', 1)[0] for l in f if '\t' in l][-1]
+    for tag, key in (('first', '0'), ('last', last), ('missing', 'nosuchkey')):
+        yield 'get_desc:' + tag, 0, lambda key=key: shell.get_desc(key)
+
+    for n in (100, 1000, 10000) if quick else (100, 1000, 10000, 100000):
+        _history(real(cio.history_file), n)
+        yield 'search_history:newest', n, lambda: cio.search_history('ls', 0)
+        yield 'search_history:oldest', n, lambda: cio.search_history('first-command', 0)
+        yield 'get_history_line:first', n, lambda: cio.get_history_line(1)
+        yield 'get_history_line:last', n, lambda n=n: cio.get_history_line(n)
+    os.remove(real(cio.history_file))
+
+    for n in (10, 100, 1000):
+        d = f'/d{n}'
+        os.mkdir(real(d))
+        for i in range(n):
+            open(real(f'{d}/file{i:04}.txt'), 'w').close()
+        yield 'ls', n, lambda d=d: shell.execute_command('ls ' + d)
+        yield 'ls -l', n, lambda d=d: shell.execute_command('ls -l ' + d)
+        shutil.rmtree(real(d))
+
+    for size in (KB, 64 * KB, MB) if quick else (KB, 64 * KB, MB, 10 * MB):
+        _file(real('/big.txt'), size)
+        yield 'cat', size, lambda: shell.execute_command('cat /big.txt')
+        yield 'wc', size, lambda: shell.execute_command('wc /big.txt')
+        os.remove(real('/big.txt'))
+
+
+def compare(base, new, threshold):
+    # prints how each case moved against base; returns the number that got slower than threshold allows
+    old = {}
+    with open(base) as f:
+        for l in f:
+            r = json.loads(l)
+            if 'name' in r:
+                old[(r['name'], r['size'])] = r
+    bad = 0
+    for r in new:
+        o = old.get((r['name'], r['size']))
+        if not o or not o['min_us']:
+            continue
+        ratio = r['min_us'] / o['min_us']
+        flag = ''
+        if ratio > threshold:
+            flag = '  <-- slower'
+            bad += 1
+        print(f"{r['name']:<28}{r['size']:>10}{o['min_us']:>14.1f}{r['min_us']:>14.1f}{ratio:>8.2f}x{flag}", file=sys.stderr)
+    return bad
+
+
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(prog='python sim/bench.py', description='Benchmark the shell under the simulator')
+    ap.add_argument('--quick', action='store_true', help='skip the largest sizes')
+    ap.add_argument('-k', dest='only', default='', help='only cases whose name contains this')
+    ap.add_argument('-o', dest='out', default=None, help='write the JSON lines here instead of stdout')
+    ap.add_argument('--budget', type=float, default=0.3, help='seconds spent on each case')
+    ap.add_argument('--compare', default=None, help='an earlier run to check this one against')
+    ap.add_argument('--threshold', type=float, default=1.25, help='slowdown ratio that counts as a regression')
+    a = ap.parse_args(argv)
+
+    root = tempfile.mkdtemp(prefix='cpybench')
+    out = open(a.out, 'w') if a.out else sys.stdout
+    results = []
+    try:
+        sb = cpysim.install(root)
+        m = cpysim.load('sh')
+        cio = m.CustomIO()
+        shell = m.sh(cio)
+        meta = {'sh': m.__version__, 'python': sys.version.split()[0], 'platform': sys.platform,
+                'time': int(time.time()), 'quick': a.quick, 'budget': a.budget}
+        print(json.dumps({'meta': meta}), file=out)
+        bi = cpysim._fake['builtins']
+        for name, size, fn in cases(sb, shell, cio, a.quick):
+            if a.only not in name:
+                continue
+            sb.cwd = '/'
+            oprint = bi.print
+            bi.print = _sink()  # the commands' output is formatted but not shown
+            try:
+                r = measure(fn, a.budget)
+            finally:
+                bi.print = oprint
+            r = dict(name=name, size=size, **r)
+            results.append(r)
+            print(json.dumps(r), file=out)
+            out.flush()
+    finally:
+        if a.out:
+            out.close()
+        shutil.rmtree(root, ignore_errors=True)
+    if a.compare and compare(a.compare, results, a.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,364 @@
+# cpysim.py
+
+__version__ = '1.0.20240626'  # Major.Minor.Patch
+
+# Created by Chris Drake.
+# Linux-like shell interface for CircuitPython.  https://github.com/gitcnd/cpy_shell
+#
+# Host-side simulator: runs the shell unmodified under CPython.
+#
+#   python sim [--root DIR] [--src DIR] [--heap BYTES] [--flash BYTES] [--offline] [--trace-mem]
+#
+# The CircuitPython-only modules (supervisor, wifi, socketpool, microcontroller, storage, rtc,
+# mdns, deflate) are stand-ins living next to this file.  The shell's own modules are loaded
+# with a private builtins dict whose open() and "import os/sys/time/gc/builtins" see a device:
+# paths are rooted in the sandbox directory (with /lib mounted on the source directory, the way
+# the .mpy files and sh.txt sit in /lib on a board), the clock follows rtc, gc has mem_free(),
+# and stdin is read unbuffered from whatever fd 0 is (a terminal, pty, pipe or file).
+
+import ast
+import builtins as _builtins
+import calendar
+import gc as _gc
+import importlib.util
+import io
+import os as _os
+import posixpath
+import sys as _sys
+import time as _time
+import types
+
+HERE = _os.path.dirname(_os.path.abspath(__file__))
+
+SETTINGS = '''HOSTNAME = "cpysim"
+GRN = "\\033[32;1m"
+YEL = "\\033[33;1m"
+RED = "\\033[31;1m"
+NORM = "\\033[0m"
+'''
+
+sb = None  # the running Sandbox
+stdin = None  # what the shell's sys.stdin reads
+clock = [0]  # seconds the simulated rtc is ahead of the host clock
+
+
+class Sandbox:
+    def __init__(self, root, src, heap=256 * 1024, flash=2 * 1024 * 1024, online=True, trace_mem=False):
+        self.root = _os.path.realpath(root)
+        _os.makedirs(self.root, exist_ok=True)
+        if not _os.path.exists(self.root + '/settings.toml'):  # a new sandbox: colours and a hostname for the prompt
+            with io.open(self.root + '/settings.toml', 'w') as f:
+                f.write(SETTINGS)
+        self.mounts = {'/lib': _os.path.realpath(src)}
+        self.cwd = '/'
+        self.heap = heap
+        self.flash = flash
+        self.online = online
+        if trace_mem:
+            import tracemalloc
+            tracemalloc.start()
+
+    def vpath(self, path):  # absolute, normalised device path; '..' can not climb out of /
+        p = posixpath.normpath(posixpath.join(self.cwd, path))
+        return '/' + p.lstrip('/')
+
+    def real(self, path):  # device path -> host path
+        if not isinstance(path, str):
+            return path  # an fd
+        v = self.vpath(path)
+        for m, d in self.mounts.items():
+            if v == m or v.startswith(m + '/'):
+                return d + v[len(m):]
+        return self.root + (v if v != '/' else '')
+
+    def used(self):
+        n = 0
+        for top in [self.root] + list(self.mounts.values()):
+            for d, _, files in _os.walk(top):
+                for f in files:
+                    try:
+                        n += _os.path.getsize(_os.path.join(d, f))
+                    except OSError:
+                        pass
+        return n
+
+
+# --- device flavoured os, time, gc, sys and builtins, for the shell's modules only ---
+
+def _oserr(e):  # CircuitPython raises plain OSError with an errno
+    return OSError(e.errno, _os.strerror(e.errno)) if getattr(e, 'errno', None) else e
+
+
+def _make_os():
+    m = types.ModuleType('os')
+    m.sep = '/'
+
+    def wrap(fn):
+        def f(*a):
+            try:
+                return fn(*a)
+            except OSError as e:
+                raise _oserr(e) from None
+        return f
+
+    def getcwd():
+        return sb.cwd
+
+    def chdir(path):
+        if not _os.path.isdir(sb.real(path)):
+            raise OSError(2, 'No such file/directory')
+        sb.cwd = sb.vpath(path)
+
+    def stat(path):
+        st = _os.stat(sb.real(path))
+        mode = 0x4000 if _os.path.isdir(sb.real(path)) else 0x8000  # FAT has no permission bits
+        return (mode, 0, 0, 0, 0, 0, st.st_size, int(st.st_atime), int(st.st_mtime), int(st.st_ctime))
+
+    def statvfs(path):
+        bs = 512
+        free = max(0, sb.flash - sb.used()) // bs
+        return (bs, bs, sb.flash // bs, free, free, 0, 0, 0, 0, 255)
+
+    def getenv(key, default=None):  # CircuitPython reads /settings.toml on every call too
+        try:
+            with io.open(sb.real('/settings.toml'), encoding='utf-8') as f:
+                for line in f:
+                    k, eq, v = line.partition('=')
+                    if eq and k.strip() == key:
+                        v = v.strip()
+                        if v[:1] in '"\'':
+                            return v[1:-1].encode().decode('unicode_escape').encode('latin-1').decode('utf-8')
+                        try:
+                            return int(v, 0)
+                        except ValueError:
+                            return v
+        except OSError:
+            pass
+        return default
+
+    def uname():
+        return ('sim', 'cpysim', _sys.version.split()[0], 'cpysim ' + __version__, 'CPython simulator')
+
+    m.getcwd = getcwd
+    m.chdir = wrap(chdir)
+    m.listdir = wrap(lambda path='.': sorted(_os.listdir(sb.real(path))))
+    m.stat = wrap(stat)
+    m.remove = wrap(lambda path: _os.remove(sb.real(path)))
+    m.rename = wrap(lambda a, b: _os.rename(sb.real(a), sb.real(b)))
+    m.mkdir = wrap(lambda path: _os.mkdir(sb.real(path)))
+    m.rmdir = wrap(lambda path: _os.rmdir(sb.real(path)))
+    m.statvfs = statvfs
+    m.getenv = getenv
+    m.sync = lambda: None
+    m.uname = uname
+    m.urandom = _os.urandom
+    return m
+
+
+def _make_time():
+    m = types.ModuleType('time')
+    m.struct_time = _time.struct_time
+    m.monotonic = _time.monotonic
+    m.monotonic_ns = _time.monotonic_ns
+    m.sleep = _time.sleep
+    m.time = lambda: int(_time.time() + clock[0])
+    m.localtime = lambda t=None: _time.gmtime(m.time() if t is None else t)  # boards have no time zone
+    m.mktime = lambda t: calendar.timegm(tuple(t))
+    return m
+
+
+def _make_gc():
+    m = types.ModuleType('gc')
+
+    def mem_alloc():  # only known when run with --trace-mem
+        import tracemalloc
+        return tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+
+    m.collect = _gc.collect
+    m.enable = _gc.enable
+    m.disable = _gc.disable
+    m.isenabled = _gc.isenabled
+    m.mem_alloc = mem_alloc
+    m.mem_free = lambda: max(0, sb.heap - mem_alloc())
+    return m
+
+
+class _Stdin:
+    # unbuffered fd 0, handed to the shell a line at a time, the way someone types: a whole pipe
+    # arriving at once would otherwise look like one giant paste
+    def __init__(self, fd=0):
+        import codecs
+        self.fd = fd
+        self.dec = codecs.getincrementaldecoder('utf-8')('replace')
+        self.buf = b''
+
+    def available(self):  # for supervisor.runtime.serial_bytes_available
+        import fcntl
+        import select
+        import struct
+        import termios
+        if not self.buf:
+            try:
+                n = struct.unpack('i', fcntl.ioctl(self.fd, termios.FIONREAD, b'\0\0\0\0'))[0]
+            except OSError:
+                n = 0
+            if n:
+                self.buf = _os.read(self.fd, n)
+            elif select.select([self.fd], [], [], 0)[0]:
+                raise EOFError('end of input')  # readable with nothing to read: the pipe or file is done
+        i = self.buf.find(b'\n') + 1
+        return i or len(self.buf)
+
+    def _read(self, n):
+        if self.buf:
+            r, self.buf = self.buf[:n], self.buf[n:]
+            return r
+        return _os.read(self.fd, n)
+
+    def read(self, n=1):  # n bytes, plus the rest of a utf-8 character if that cut one in half
+        b = b''
+        while len(b) < n:
+            r = self._read(n - len(b))
+            if not r:
+                break
+            b += r
+        out = self.dec.decode(b)
+        while self.dec.getstate()[0]:
+            r = self._read(1)
+            if not r:
+                break
+            out += self.dec.decode(r)
+        return out
+
+    def readline(self):
+        out = ''
+        while not out.endswith('\n'):
+            c = self.read(1)
+            if not c:
+                break
+            out += c
+        return out
+
+
+class _Stdout:
+    def write(self, s):
+        _sys.stdout.write(s)
+        _sys.stdout.flush()
+        return len(s)
+
+    def flush(self):
+        _sys.stdout.flush()
+
+
+class _Sys(types.ModuleType):
+    def __getattr__(self, name):  # everything but stdin/stdout is the real thing (sys.modules in particular)
+        return getattr(_sys, name)
+
+
+_fake = {}
+
+
+def _import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level == 0 and name in _fake:
+        return _fake[name]
+    return _builtins.__import__(name, globals, locals, fromlist, level)
+
+
+def _open(file, mode='r', buffering=-1, encoding=None, errors=None, newline=None, closefd=True, opener=None):
+    if 'b' not in mode:  # no newline translation on the device, and always utf-8
+        encoding = encoding or 'utf-8'
+        newline = '' if newline is None else newline
+    try:
+        return io.open(sb.real(file), mode, buffering, encoding, errors, newline, closefd, opener)
+    except OSError as e:
+        raise _oserr(e) from None
+
+
+def _make_builtins():
+    # a module of its own, so the shell's "builtins.print = ..." redirection reaches every one of its modules but not us
+    m = types.ModuleType('builtins')
+    m.__dict__.update(_builtins.__dict__)
+    m.__dict__['open'] = _open
+    m.__dict__['__import__'] = _import
+    return m
+
+
+class _Finder:
+    # loads the shell's modules (sh, sh0..., shnet) from the source directory with the device builtins
+    def __init__(self, src):
+        self.src = src
+
+    def find_spec(self, name, path=None, target=None):
+        fn = _os.path.join(self.src, name + '.py')
+        if '.' in name or not _os.path.isfile(fn):
+            return None
+        return importlib.util.spec_from_loader(name, self, origin=fn)
+
+    def create_module(self, spec):
+        return None
+
+    def exec_module(self, module, skip_main=False):
+        fn = _os.path.join(self.src, module.__name__ + '.py')
+        with io.open(fn, encoding='utf-8') as f:
+            tree = ast.parse(f.read(), fn)
+        if skip_main:  # drop sh.py's top level main() call
+            tree.body = [n for n in tree.body if not (isinstance(n, ast.Expr) and isinstance(n.value, ast.Call)
+                                                      and getattr(n.value.func, 'id', '') == 'main')]
+        module.__dict__['__builtins__'] = _fake['builtins'].__dict__
+        module.__file__ = '/lib/' + module.__name__ + '.py'
+        exec(compile(tree, fn, 'exec'), module.__dict__)
+
+
+def install(root, src=None, **kw):
+    # set up the sandbox and the stand-in modules; returns the Sandbox
+    global sb
+    src = src or _os.path.join(HERE, '..', 'src')
+    sb = Sandbox(root, src, **kw)
+    if HERE not in _sys.path:
+        _sys.path.insert(0, HERE)
+    global stdin
+    stdin = _Stdin()
+    s = _Sys('sys')
+    s.stdin = stdin
+    s.stdout = _Stdout()
+    _fake.update({'os': _make_os(), 'time': _make_time(), 'gc': _make_gc(), 'sys': s})
+    _fake['builtins'] = _make_builtins()
+    _sys.meta_path.insert(0, _Finder(sb.mounts['/lib']))
+    return sb
+
+
+def load(name='sh', run=False):
+    # import one of the shell's modules; sh.py's top level main() call is skipped unless run (for benchmarks and tests)
+    f = next(f for f in _sys.meta_path if isinstance(f, _Finder))
+    m = types.ModuleType(name)
+    _sys.modules[name] = m
+    f.exec_module(m, skip_main=not run)
+    return m
+
+
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(prog='python sim', description='Run cpy_shell under CPython')
+    ap.add_argument('--root', default=_os.path.join(HERE, 'root'), help='sandbox directory that is / on the device')
+    ap.add_argument('--src', default=None, help='shell sources, mounted as /lib (default: ../src)')
+    ap.add_argument('--heap', type=int, default=256 * 1024, help='bytes gc.mem_alloc() + gc.mem_free() adds up to')
+    ap.add_argument('--flash', type=int, default=2 * 1024 * 1024, help='filesystem size for df')
+    ap.add_argument('--offline', action='store_true', help='wifi has no address')
+    ap.add_argument('--trace-mem', action='store_true', help='track allocations so gc.mem_alloc() is real (slow)')
+    a = ap.parse_args(argv)
+    install(a.root, a.src, heap=a.heap, flash=a.flash, online=not a.offline, trace_mem=a.trace_mem)
+    old = None
+    if _os.isatty(0):  # keys one at a time, no echo: the shell does its own line editing
+        import termios
+        import tty
+        old = termios.tcgetattr(0)
+        tty.setcbreak(0)
+    try:
+        load('sh', run=True)
+    except (EOFError, SystemExit):
+        pass
+    except KeyboardInterrupt:
+        print()
+    finally:
+        if old:
+            termios.tcsetattr(0, termios.TCSADRAIN, old)
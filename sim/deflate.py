@@ -0,0 +1,61 @@
+# deflate.py - simulator stand-in (see cpysim.py) for MicroPython's streaming DeflateIO, on top of zlib
+
+import zlib
+
+AUTO = 0
+RAW = 1
+ZLIB = 2
+GZIP = 3
+
+
+class DeflateIO:
+    def __init__(self, stream, format=AUTO, wbits=0, close=False):
+        self.s = stream
+        self.fmt = format
+        self.wbits = max(9, wbits or 8)  # window used when compressing; zlib's smallest is 512 bytes
+        self.close_stream = close
+        self.d = self.c = None
+        self.buf = b''
+        self.eof = False
+
+    def _more(self):
+        if self.d is None:
+            self.d = zlib.decompressobj({AUTO: 47, RAW: -15, ZLIB: 15, GZIP: 31}[self.fmt])  # the largest window reads any stream
+        raw = self.s.read(256)
+        if not raw or self.d.eof:
+            self.eof = True
+            self.buf += self.d.flush()
+        else:
+            self.buf += self.d.decompress(raw)
+
+    def read(self, n=-1):
+        while (n < 0 or len(self.buf) < n) and not self.eof:
+            self._more()
+        n = len(self.buf) if n < 0 else n
+        r, self.buf = self.buf[:n], self.buf[n:]
+        return r
+
+    def readinto(self, b):
+        r = self.read(len(b))
+        b[:len(r)] = r
+        return len(r)
+
+    def readline(self):
+        while b'\n' not in self.buf and not self.eof:
+            self._more()
+        i = self.buf.find(b'\n') + 1 or len(self.buf)
+        r, self.buf = self.buf[:i], self.buf[i:]
+        return r
+
+    def write(self, b):
+        if self.c is None:
+            self.c = zlib.compressobj(6, zlib.DEFLATED, {RAW: -self.wbits, GZIP: 16 + self.wbits}.get(self.fmt, self.wbits))
+        self.s.write(self.c.compress(bytes(b)))
+        return len(b)
+
+    def close(self):
+        if self.c is not None:
+            self.s.write(self.c.flush())
+            self.c = None
+        if self.close_stream:
+            self.s.close()
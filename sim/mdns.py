@@ -0,0 +1,16 @@
+# mdns.py - simulator stand-in (see cpysim.py)
+
+
+class Server:
+    def __init__(self, network_interface):
+        self.hostname = 'cpy-' + ''.join('{:02x}'.format(b) for b in network_interface.mac_address[3:])
+        self.instance_name = self.hostname
+
+    def find(self, service_type, protocol, *, timeout=1.0):
+        return ()  # nobody else on the simulated network
+
+    def advertise_service(self, *, service_type, protocol, port, txt_records=()):
+        pass
+
+    def deinit(self):
+        pass
@@ -0,0 +1,22 @@
+# microcontroller.py - simulator stand-in (see cpysim.py)
+
+import os
+import types
+
+cpu = types.SimpleNamespace(frequency=240000000, temperature=42.0, voltage=3.3, uid=bytearray(os.urandom(6)))
+nvm = bytearray(8192)
+
+
+class RunMode:
+    NORMAL = 0
+    SAFE_MODE = 1
+    UF2 = 2
+    BOOTLOADER = 3
+
+
+def on_next_reset(run_mode):
+    pass
+
+
+def reset():
+    raise SystemExit('microcontroller.reset()')
@@ -0,0 +1,22 @@
+# rtc.py - simulator stand-in (see cpysim.py): setting the time moves the clock the shell sees, not the host's
+
+import calendar
+import time
+
+import cpysim
+
+
+class RTC:
+    @property
+    def datetime(self):
+        return time.gmtime(time.time() + cpysim.clock[0])
+
+    @datetime.setter
+    def datetime(self, t):
+        cpysim.clock[0] = calendar.timegm(tuple(t)) - time.time()
+
+    calibration = 0
+
+
+def set_time_source(rtc):
+    pass
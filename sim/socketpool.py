@@ -0,0 +1,29 @@
+# socketpool.py - simulator stand-in (see cpysim.py): the host's sockets have the same calls
+
+import socket
+
+
+class SocketPool:
+    AF_INET = socket.AF_INET
+    AF_INET6 = socket.AF_INET6
+    SOCK_STREAM = socket.SOCK_STREAM
+    SOCK_DGRAM = socket.SOCK_DGRAM
+    SOCK_RAW = socket.SOCK_RAW  # needs root on the host, like ping(8)
+    IPPROTO_IP = socket.IPPROTO_IP
+    IPPROTO_ICMP = socket.IPPROTO_ICMP
+    IPPROTO_TCP = socket.IPPROTO_TCP
+    IPPROTO_UDP = socket.IPPROTO_UDP
+    SOL_SOCKET = socket.SOL_SOCKET
+    SO_REUSEADDR = socket.SO_REUSEADDR
+    TCP_NODELAY = socket.TCP_NODELAY
+    EAI_NONAME = socket.EAI_NONAME
+    gaierror = socket.gaierror
+
+    def __init__(self, radio):
+        self.radio = radio
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        return socket.getaddrinfo(host, port, family or socket.AF_INET, type or socket.SOCK_STREAM, proto, flags)
+
+    def socket(self, family=AF_INET, type=SOCK_STREAM, proto=0):
+        return socket.socket(family, type, proto)
@@ -0,0 +1,17 @@
+# storage.py - simulator stand-in (see cpysim.py)
+
+
+def remount(mount_path, readonly=False, *, disable_concurrent_write_protection=False):
+    pass  # the sandbox is always writable
+
+
+def disable_usb_drive():
+    pass
+
+
+def enable_usb_drive():
+    pass
+
+
+def erase_filesystem(extended=None):
+    raise OSError(1, 'erase_filesystem is not simulated; delete the sandbox directory instead')
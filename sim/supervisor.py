@@ -0,0 +1,23 @@
+# supervisor.py - simulator stand-in (see cpysim.py)
+
+import cpysim
+
+
+class _Runtime:
+    @property
+    def serial_bytes_available(self):
+        return cpysim.stdin.available()
+
+    serial_connected = True
+    usb_connected = True
+
+
+runtime = _Runtime()
+
+
+def reload():
+    raise SystemExit('supervisor.reload()')
+
+
+def set_next_code_file(filename, **kw):
+    pass
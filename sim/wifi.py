@@ -0,0 +1,70 @@
+# wifi.py - simulator stand-in (see cpysim.py): "connected" with the host's address unless run with --offline
+
+import ipaddress
+import re
+import socket
+import subprocess
+import types
+
+import cpysim
+
+
+def _host_ip():
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        s.connect(('10.255.255.255', 1))  # picks the outgoing interface, sends nothing
+        return s.getsockname()[0]
+    except OSError:
+        return '127.0.0.1'
+    finally:
+        s.close()
+
+
+class _Radio:
+    enabled = True
+    tx_power = 20.0
+    mac_address = bytes([0x02, 0x00, 0x00, 0x5e, 0x00, 0x01])
+    ap_info = types.SimpleNamespace(ssid='cpysim', bssid=bytes([0x02, 0, 0, 0, 0, 0xfe]), channel=6, country='US', rssi=-42, authmode=())
+
+    def __init__(self):
+        self.hostname = socket.gethostname()
+        self._ip = None
+
+    @property
+    def ipv4_address(self):
+        if not cpysim.sb or not cpysim.sb.online:
+            return None
+        if self._ip is None:
+            self._ip = ipaddress.ip_address(_host_ip())
+        return self._ip
+
+    @property
+    def ipv4_subnet(self):
+        return ipaddress.ip_address('255.255.255.0') if self.ipv4_address else None
+
+    @property
+    def ipv4_gateway(self):
+        return ipaddress.ip_address(str(self.ipv4_address).rsplit('.', 1)[0] + '.1') if self.ipv4_address else None
+
+    @property
+    def ipv4_dns(self):
+        try:
+            with open('/etc/resolv.conf') as f:
+                return ipaddress.ip_address(re.search(r'^nameserver\s+(\S+)', f.read(), re.M).group(1))
+        except Exception:
+            return ipaddress.ip_address('0.0.0.0')
+
+    def ping(self, ip, *, timeout=0.5):  # seconds, or None on timeout; done by the host's ping(8)
+        try:
+            r = subprocess.run(['ping', '-n', '-c', '1', '-W', str(max(1, round(timeout))), str(ip)],
+                               capture_output=True, text=True, timeout=timeout + 2)
+            m = re.search(r'time[=<]([\d.]+) ms', r.stdout)
+            return float(m.group(1)) / 1000 if m else None
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+
+    def connect(self, ssid, password='', *, channel=0, bssid=None, timeout=None):
+        pass
+
+
+radio = _Radio()
@@ -23,12 +23,29 @@ __version__ = '1.0.20240628'  # Major.Minor.Patch
 # 1718841600 # 2024/06/20 
 
 import os, gc
-import supervisor
+import time
+
+# startup trace (SH_TRACE=1 in settings.toml): [phase, ms, bytes allocated] for each import and init phase; see the trace command
+_trace = [] if os.getenv("SH_TRACE") else None
+
+# switches that take the next word as their value (sort -k 2); bound while parsing, so the order a command asks for them in does not matter
+_VSW = {'tail': 'n', 'sort': 'ktS', 'diff': 'U', 'tar': 'f', 'curl': 'o', 'wget': 'o', 'ping': 'ciW'}
+
+def _tstart():
+    return (time.monotonic_ns(), gc.mem_alloc()) if _trace is not None else None
 
+def _tend(phase, st):
+    if st:
+        _trace.append((phase, (time.monotonic_ns() - st[0]) / 1000000, gc.mem_alloc() - st[1]))
+
+_boot = _tstart()
+_st = _tstart()
+import supervisor
+_tend("import supervisor", _st)
+_st = _tstart()
 import sys
-import socketpool
-import wifi
-import time
+_tend("import sys", _st)
+# networking (wifi, socketpool via shnet) is only imported by the code that needs it
 
 
 
@@ -41,6 +58,12 @@ class CustomIO:
         self.infiles = []   # List of open file objects for input
         self.socket_buffers = {}  # Dictionary to store buffers for each socket
         self.history_file = "/.history.txt"  # Path to the history file
+        self.hmax = int(os.getenv("HISTFILESIZE", 500))  # history file caps: lines, bytes; trimmed to 3/4 of them in the background
+        self.hbytes = int(os.getenv("SH_HISTBYTES", 16384))
+        self._hq = []  # history lines not written yet: flushed when 8 are waiting, after 30s idle, before it is read, and at exit
+        self._hlast = None  # last line added, so repeats are not stored
+        self._hn = None  # lines in the history file, once counted
+        self._hc = False  # compaction running
 
         self._nbuf = ""
         self._line = ""
@@ -50,6 +73,7 @@ class CustomIO:
         self._reading_esc = False
         self._insert_mode = True  # Default to insert mode
         self._hist_loc = -1  # Start with the most recent command (has 1 added before use; 0 means last)
+        self._rs = False  # ^R search in progress (see shhist.py)
 
         # New global variables for terminal size and type
         self._TERM_WIDTH = 80
@@ -57,7 +81,10 @@ class CustomIO:
         self._TERM_TYPE = ""
         self._TERM_TYPE_EX = ""
 
-        if time.time() < 1718841600 and wifi.radio.ipv4_address: self.set_time() # set the time if possible and not already set
+        self._probe = None  # trace: when the terminal size request went out
+        self._tasks = []  # background generators, each given a step while we wait for keys (see _bg)
+        if time.time() < 1718841600: # clock not set: start from the last time we knew, and fix it from NTP once the prompt is up
+            self._tasks.append(self._ntp(self._load_time()))
 
 
     # Initialize buffers for sockets
@@ -89,6 +116,7 @@ class CustomIO:
         self._line=command
 
     def get_history_line(self,n):
+        self.flush_hist()
         with open(self.history_file, "r") as f:
             for i, line in enumerate(f):
                 if i == n - 1:
@@ -97,6 +125,7 @@ class CustomIO:
     
 
     def search_history(self, pfx, hist_loc):
+        self.flush_hist()
         with open(self.history_file, "rb") as f:
             f.seek(0, 2)  # Seek to the end of the file
             file_size = f.tell()
@@ -146,6 +175,9 @@ class CustomIO:
     def _process_input(self, char):
         self._lastread = time.monotonic()
         
+        if self._rs:
+            import shhist
+            return shhist.key(self, char)
         if self._reading_esc:
             self._esc_seq += char
             if time.monotonic() - self._lastread > 0.1:
@@ -193,6 +225,10 @@ class CustomIO:
                 self._hist_loc = -1
                 return ret_line, 'enter', self._cursor_pos
 
+        elif char == '\x12':  # ^R reverse incremental search
+            import shhist
+            self._rs = True
+            shhist.start(self)
         elif char == '\001':  # repl exit
             return 'exit', 'enter', 0
         elif char == '\t':  # Tab
@@ -216,12 +252,10 @@ class CustomIO:
                     print(f"Error listing directory: {e}")
 
             else:
-                from sh1 import _iter_cmds
-                for cmd in _iter_cmds():
+                for cmd in self._sh._mod("sh1", False)._iter_cmds(self._sh):
                     if cmd.startswith(current_input):
                          self.ins_command(self._line[:self._cursor_pos] + cmd[len(current_input):] + ' ' + self._line[self._cursor_pos:])
                          break
-                del sys.modules["sh1"]
 
         else:
             if self._insert_mode:
@@ -298,6 +332,8 @@ class CustomIO:
                 self._TERM_HEIGHT, self._TERM_WIDTH = map(int, seq[:-1].split(';'))
             except Exception as e:
                 print(f"term-size set command {seq[:-1]} error: {e}")
+            _tend("terminal probe", self._probe)
+            self._probe = None
             return self._line, 'sz', self._cursor_pos
         elif seq.startswith('>') and seq.endswith('c'):  # Extended device Attributes
             self._TERM_TYPE_EX = seq[1:-1]
@@ -343,6 +379,12 @@ class CustomIO:
                 # self.input_content += chars 
                 # self._lastread=time.monotonic()
             elif time.monotonic()-self._lastread>0.1:
+                self._bg()
+                if self._hq and time.monotonic()-self._lastread>30:
+                    self.flush_hist()
+                n = sys.modules.get('shnet')
+                if n and n._idle: # keep-alive sockets are scarce: do not hold on to them past their idle timeout
+                    n.reap()
                 time.sleep(0.1)  # Small delay to prevent high CPU usage
 
         # Read from input files
@@ -363,19 +405,44 @@ class CustomIO:
         return None
 
 
-    def add_hist(self, line, retry=True):
+    def add_hist(self, line):
+        if line == self._hlast: # collapse repeats
+            return
+        self._hlast = line
+        self._hq.append(f"{int(time.time())}\t{line}\n")
+        if len(self._hq) >= 8:
+            self.flush_hist()
+
+    def flush_hist(self, retry=True): # write the queued history lines in one go
+        if not self._hq:
+            return
         try:
+            data = ''.join(self._hq)
             with open(self.history_file, 'a') as hist_file:
-                hist_file.write(f"{int(time.time())}\t{line}\n")
+                hist_file.write(data)
+                size = hist_file.tell()
         except OSError:
             # If an OSError is raised, the file system is read-only
             if retry:
-                import storage
                 try:
+                    import storage
                     storage.remount("/", False)
-                    add_hist(self, line, False)
-                except: 
+                    return self.flush_hist(False)
+                except Exception:
                     pass
+            del self._hq[:-8] # still read-only: keep only the newest few in RAM
+            return
+        h = sys.modules.get('shhist')
+        if h: # keep the ^R index up to date
+            data = data.encode('utf-8')
+            h.add(size - len(data), data)
+        if self._hn is not None:
+            self._hn += len(self._hq)
+        self._hq = []
+        if (self._hn is None or self._hn > self.hmax or size > self.hbytes) and not self._hc:
+            self._hc = True
+            import shhist # loaded for this only; it lets go of itself when done, unless ^R needs it
+            self._tasks.append(shhist.compact(self))
 
     def readline(self):
         if self.input_content:
@@ -443,10 +510,11 @@ class CustomIO:
     # Method to open a socket
     def open_socket(self, address, port, timeout=10):
         try:
-            pool = socketpool.SocketPool(wifi.radio)
+            import shnet
+            pool = shnet.pool()
             sock = pool.socket(pool.AF_INET, pool.SOCK_STREAM)
             sock.settimeout(timeout)
-            sock.connect((address, port))
+            sock.connect((shnet.addr(address), port))
             self.sockets.append(sock)
             #print("Socket connected successfully.") #DBG
             self.initialize_buffers()
@@ -456,7 +524,7 @@ class CustomIO:
     """ # Method to open a listening socket on port 23 for Telnet
     def open_listening_socket(self, port=23):
         try:
-            pool = socketpool.SocketPool(wifi.radio)
+            pool = shnet.pool()
             server_sock = pool.socket(pool.AF_INET, pool.SOCK_STREAM)
             server_sock.bind(("", port))
             server_sock.listen(1)
@@ -469,33 +537,82 @@ class CustomIO:
 
     # Method to flush buffers
     def flush(self):
+        self.flush_hist()
         while self.send_chars_to_all(""):
             pass # time.sleep(0.1)  # Prevent a tight loop
 
-    def set_time(self):
-        import rtc, struct
-        buf = bytearray(48)
-        buf[0] = 0b00100011
-    
+    def _bg(self): # give each background task one step
+        for t in self._tasks[:]:
+            try:
+                next(t)
+            except StopIteration:
+                self._tasks.remove(t)
+
+    def _load_time(self): # the clock as of the last NTP sync is a better guess than 2000-01-01; returns the server's address then
         try:
-            # Create socket
-            pool = socketpool.SocketPool(wifi.radio)
-            sock = pool.socket(pool.AF_INET, pool.SOCK_DGRAM)
-            sock.settimeout(1)
-    
-            # Send NTP request
-            sock.sendto(buf, ("pool.ntp.org", 123))
-    
-            # Receive NTP response
-            sock.recv_into(buf)
-    
-            rtc.RTC().datetime = time.localtime(struct.unpack("!I", buf[40:44])[0] - 2208988800) # NTP timestamp starts from 1900, Unix from 1970
-    
-        except Exception as e:
-            print(self.get_desc('8').format(e)) # Failed to get NTP time: {}
-        finally:
-            sock.close()
-        self.add_hist("#boot")
+            import rtc
+            with open("/.ntp.txt") as f:
+                t = f.read().split()
+            rtc.RTC().datetime = time.localtime(int(t[0]))
+            return t[1]
+        except Exception:
+            pass
+
+    def _ntp(self, ip=None):
+        # background task: non-blocking NTP query, retried with backoff until the clock is set.
+        # ip: the server that answered last boot, so the first try needs no DNS lookup (getaddrinfo blocks)
+        import rtc, struct, wifi
+        st = _tstart()
+        wait = 2
+        boot = True # #boot goes into the history after the first try, whether or not it set the clock
+        while True:
+            sock = None
+            ok = False
+            try:
+                if wifi.radio.ipv4_address:
+                    import shnet
+                    buf = bytearray(48)
+                    buf[0] = 0b00100011
+                    pool = shnet.pool()
+                    sock = pool.socket(pool.AF_INET, pool.SOCK_DGRAM)
+                    sock.settimeout(0)
+                    ip = ip or shnet.addr("pool.ntp.org") # from shnet's cache when it is fresh
+                    sock.sendto(buf, (ip, 123))
+                    t = time.monotonic()
+                    while time.monotonic() - t < 2:
+                        try:
+                            if sock.recv_into(buf) == 48:
+                                break
+                        except OSError: # nothing yet
+                            pass
+                        yield
+                    else:
+                        raise OSError("timed out")
+                    now = struct.unpack("!I", buf[40:44])[0] - 2208988800 # NTP timestamp starts from 1900, Unix from 1970
+                    rtc.RTC().datetime = time.localtime(now)
+                    try:
+                        with open("/.ntp.txt", "w") as f: # for the next boot
+                            f.write(f"{now} {ip}")
+                    except OSError:
+                        pass
+                    _tend("ntp", st)
+                    ok = True
+            except Exception:
+                ip = None # no DNS, no route, or the old server is gone... look it up again next time
+            finally:
+                if sock:
+                    sock.close()
+            if boot:
+                boot = False
+                hs = _tstart()
+                self.add_hist("#boot")
+                _tend("history", hs)
+            if ok:
+                return
+            t = time.monotonic()
+            while time.monotonic() - t < wait:
+                yield
+            wait = min(wait * 2, 300)
 
 
 class IORedirector:
@@ -512,12 +629,17 @@ class IORedirector:
         builtins.print = self.custom_print
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        self.custom_io.flush_hist() # ^C out of the shell keeps the last commands too
         import builtins
         builtins.input = self.old_input
         builtins.print = self.old_print
 
     def custom_input(self, prompt=''):
+        global _boot
         self.custom_print(prompt, end='')
+        if _boot: # trace: once the first prompt is on the screen
+            _tend("first prompt", _boot)
+            _boot = None
         while True:
             line = self.custom_io.read_input()
             if line is not None:
@@ -532,8 +654,22 @@ class IORedirector:
 
 
 class sh:
-    def __init__(self):
-        pass # self.history_file = "/history.txt"
+    def __init__(self, custom_io=None):
+        self.io = custom_io # commands that need the terminal (size, raw keys) reach it through here
+        if custom_io:
+            custom_io._sh = self # tab completion loads command modules through _mod
+        self.trace = None # startup trace, when SH_TRACE is set
+        self.err = 0 # set when a command reports an error
+        self.jobs = [] # background jobs: [number, command line, generator, output so far, state, task (None once finished, False once reported)]
+        self._spawn = False # True while starting a job: the command's generator is kept here instead of being run
+        n = os.getenv("SH_PROF") # profile every command into a ring buffer of this many entries; see the stats command
+        self.prof = [None] * int(n) if n else None
+        self._pn = 0 # commands profiled so far; the next one goes in prof[_pn % len(prof)]
+        self.keep = int(os.getenv("SH_KEEP", 65536)) # command modules stay loaded while more than this many bytes are free
+        self._code = None # ((path, mtime, size), [code, ...]) of the last script run or run2 compiled
+        self._mods = [] # command modules we loaded, least recently used first
+        self.mhit = self.mmiss = 0 # commands modules found still loaded / that had to be imported
+        self._ph = None # the command being profiled: [last lap, parse, alias, import, run, unload, peak alloc, start alloc, start]
 
 
     # """For reading help and error messages etc out of a text file"""
@@ -549,12 +685,57 @@ class sh:
 
         return None
 
-    # error-message expander helpers
+    # error-message expander helpers; they also set err, which source -e stops on
     def _ea(shell, cmdenv):
-        print(shell.get_desc('9').format(cmdenv['args'][0])) # {}: missing operand(s)
+        shell.err = 1
+        shell._say(cmdenv, shell.get_desc('9').format(cmdenv['args'][0])) # {}: missing operand(s)
 
     def _ee(shell, cmdenv, e):
-        print(shell.get_desc('10').format(cmdenv['args'][0],e)) # {}: {}
+        shell.err = 1
+        shell._say(cmdenv, shell.get_desc('10').format(cmdenv['args'][0],e)) # {}: {}
+
+    # --json, or OUTPUT=jsonl in settings.toml: ls, df, free, ifconfig and history print one compact JSON record per item
+    def _js(shell, cmdenv):
+        return cmdenv['sw'].get('json') or os.getenv('OUTPUT') == 'jsonl'
+
+    def _jd(shell, d):
+        import json
+        return json.dumps(d, separators=(',', ':'))
+
+    def _say(shell, cmdenv, msg): # a message, or an {"error": ...} record in JSON mode
+        print(shell._jd({'error': msg}) if shell._js(cmdenv) else msg)
+
+    # stdout writer for bytes read in blocks: holds back a utf-8 sequence cut in half by the end of a block
+    def _u8(shell):
+        tail = [b'']
+
+        def out(m):
+            b = tail[0] + bytes(m)
+            i = len(b) - 1
+            while i > 0 and i > len(b) - 4 and b[i] & 0xc0 == 0x80:
+                i -= 1
+            cut = len(b)
+            if i >= 0 and b[i] >= 0xc0 and len(b) - i < (2 if b[i] < 0xe0 else 3 if b[i] < 0xf0 else 4):
+                cut = i
+            tail[0] = b[cut:]
+            print(shell._dec(b[:cut]), end='')
+        return out
+
+    # bytes as text for the terminal; bytes that are not UTF-8 show as '?' (MicroPython's decode has no errors='replace')
+    def _dec(shell, b):
+        try:
+            return b.decode('utf-8')
+        except UnicodeError:
+            return ''.join(chr(c) if c < 128 else '?' for c in b)
+
+    # where a command's stdin is coming from: a file from < or a pipe, else None
+    def _stdin(shell, cmdenv):
+        return cmdenv.get('redirections', {}).get('stdin')
+
+    # value of a switch given as -n5, --n=5 or -n 5 (the parser binds that one for the switches in _VSW); default if it has none
+    def _swv(shell, cmdenv, key, default=None):
+        v = cmdenv['sw'].get(key, default)
+        return default if v is True else v
 
 
     def file_exists(self, filepath):
@@ -690,29 +871,14 @@ class sh:
                     in_single_quote = not in_single_quote
                     part += char
                 elif char == '`' and not in_single_quote and not in_double_quote and in_subshell == 0:
-                    if in_backticks:
-                        in_backticks = False
-                        part += char
-                        parts.append(part)
-                        part = ''
-                    else:
-                        if part:
-                            parts.append(part)
-                            part = ''
-                        in_backticks = True
-                        part += char
+                    in_backticks = not in_backticks # part of the word it is in: a/`cmd`/b is one argument
+                    part += char
                 elif char == '$' and i + 1 < len(command_line) and command_line[i + 1] == '(' and not in_single_quote and not in_double_quote and not in_backticks:
-                    if in_subshell == 0 and part:
-                        parts.append(part)
-                        part = ''
                     in_subshell += 1
                     part += char
                 elif char == ')' and not in_single_quote and not in_double_quote and not in_backticks and in_subshell > 0:
                     in_subshell -= 1
                     part += char
-                    if in_subshell == 0:
-                        parts.append(part)
-                        part = ''
                 elif char.isspace() and not in_single_quote and not in_double_quote and not in_backticks and in_subshell == 0:
                     if part:
                         parts.append(part)
@@ -721,6 +887,9 @@ class sh:
                     if part:
                         parts.append(part)
                         part = ''
+                    if char == '>' and command_line[i + 1:i + 2] == '>':
+                        char = '>>'
+                        i += 1
                     parts.append(char)
                 else:
                     part += char
@@ -735,9 +904,16 @@ class sh:
 
         def substitute_backticks(value):
             # """Substitute commands within backticks and $(...) with their output."""
-            def substitute(match):
-                command = match.group(1)
-                return self.execute_command(command)  # Placeholder for actual command execution
+            def substitute(command):  # what the command prints, trailing newlines dropped, as the text to splice in
+                import builtins
+                op = builtins.print
+                out = []
+                builtins.print = lambda *a, **k: out.append(k.get('sep', ' ').join(map(str, a)) + k.get('end', '\n'))
+                try:
+                    self.execute_command(command)
+                finally:
+                    builtins.print = op
+                return ''.join(out).rstrip('\n')
 
             while '`' in value or '$(' in value:
                 if '`' in value:
@@ -749,7 +925,7 @@ class sh:
                         break
                     command = value[start + 1:end]
                     #print(f"` command={command}")
-                    value = value[:start] + self.execute_command(command) + value[end + 1:]
+                    value = value[:start] + substitute(command) + value[end + 1:]
                     #print(f"` new value={value}")
                 if '$(' in value:
                     start = value.find('$(')
@@ -764,9 +940,8 @@ class sh:
                             open_parens -= 1
                         end += 1
                     command = value[start + 2:end - 1]
-                    command = value[start + 2:end]
                     #print(f"$( command={command}")
-                    value = value[:start] + self.execute_command(command) + value[end:]
+                    value = value[:start] + substitute(command) + value[end:]
                     #print(f"$( new value={value}")
             return value
 
@@ -775,8 +950,7 @@ class sh:
             # """Process parts into switches and arguments."""
             #sw = {}
             #arg = []
-            redirections = {'stdin': None, 'stdout': None, 'stderr': None}
-            current_cmd = {'line': '', 'sw': {}, 'args': [], 'redirections': redirections, 'pipe_from': None}
+            current_cmd = {'line': '', 'sw': {}, 'args': [], 'redirections': {'stdin': None, 'stdout': None, 'stderr': None}, 'pipe_from': None}
 
             cmds = [current_cmd]
             i = 0
@@ -786,13 +960,13 @@ class sh:
                     current_cmd = {'line': '', 'sw': {}, 'args': [], 'redirections': {'stdin': None, 'stdout': None, 'stderr': None}, 'pipe_from': cmds[-1]}
                     cmds.append(current_cmd)
                 elif part == '>':
-                    redirections['stdout'] = parts[i + 1]
+                    current_cmd['redirections']['stdout'] = parts[i + 1]
                     i += 1
                 elif part == '>>':
-                    redirections['stdout'] = {'append': parts[i + 1]}
+                    current_cmd['redirections']['stdout'] = {'append': parts[i + 1]}
                     i += 1
                 elif part == '<':
-                    redirections['stdin'] = parts[i + 1]
+                    current_cmd['redirections']['stdin'] = parts[i + 1]
                     i += 1
                 elif part.startswith('--'):
                     if '=' in part:
@@ -808,12 +982,23 @@ class sh:
                     j = 1
                     while j < len(part):
                         if part[j].isalpha():
+                            if j + 1 < len(part) and not part[j + 1].isalpha(): # -n5 means n=5, -t, means t=','
+                                current_cmd['sw'][part[j]] = part[j + 1:]
+                                break
                             current_cmd['sw'][part[j]] = True
                             j += 1
                         else:
                             current_cmd['sw'][part[j]] = part[j + 1:] if j + 1 < len(part) else True
                             break
                     current_cmd['line'] += ' ' + part
+                    c = part[-1]
+                    if current_cmd['sw'].get(c) is True and c in _VSW.get(current_cmd['args'][0] if current_cmd['args'] else '', '') and i + 1 < len(parts) and parts[i + 1] not in ('|', '>', '>>', '<'):
+                        i += 1
+                        part = parts[i]
+                        if not (part.startswith("'") and part.endswith("'")):
+                            part = self.subst_env(substitute_backticks(part))
+                        current_cmd['sw'][c] = part
+                        current_cmd['line'] += ' ' + part
                 else:
                     if not (part.startswith("'") and part.endswith("'")):
                         part = self.subst_env(substitute_backticks(part))
@@ -839,15 +1024,59 @@ class sh:
         return f"{round(size):,}P"  # Handle very large sizes as petabytes
 
     
+    # profiling: charge the time since the last lap to phase i (1 parse, 2 alias, 3 import, 4 run, 5 unload)
+    def _lap(self, i):
+        p = self._ph
+        if p:
+            t = time.monotonic_ns()
+            p[i] += t - p[0]
+            p[0] = t
+            a = gc.mem_alloc()
+            if a > p[6]:
+                p[6] = a
+
     def execute_command(self,command):
+        c = command.rstrip()
+        if c.endswith('&') and self.io: # cmd &: a background job
+            return self._mod('sh4')._job(self, c[:-1].strip()) # jobs live in sh4, next to jobs/fg/kill
+        # "time <cmd>" profiles one command, SH_PROF all of them; nested ones (`...`, $(...)) count towards the outer one
+        timed = command.startswith('time ')
+        if timed:
+            command = command[5:]
+        if self._ph is not None or not (timed or self.prof):
+            return self._execute(command)
+        t = time.monotonic_ns()
+        a = gc.mem_alloc()
+        self._ph = p = [t, 0, 0, 0, 0, 0, a, a, t]
+        try:
+            return self._execute(command)
+        finally:
+            self._ph = None
+            a = gc.mem_alloc()
+            r = [command, (time.monotonic_ns() - p[8]) // 1000] # microseconds: small ints, no floats kept
+            for v in p[1:6]:
+                r.append(v // 1000)
+            r.append(max(p[6], a) - p[7]) # heap peak above where we started (sampled at each lap)
+            r.append(a - p[7])
+            if self.prof is None:
+                self.prof = [None] * 8
+            self.prof[self._pn % len(self.prof)] = r
+            self._pn += 1
+            if timed:
+                print(self.get_desc('22').format(*[v / 1000 for v in r[1:7]], r[7], r[8])) # real {} ms (parse ...
+
+    def _execute(self,command):
         # """Execute a command and return its output. Placeholder for actual execution logic."""
-        for _ in range(2): # optional alias expander
+        spawn, self._spawn = self._spawn, False # cmd &: held back while `...` and $(...) in the line run, for this command alone
+        for n in range(2): # optional alias expander
             parts = self.parse_command_line(command)
+            self._lap(2 if n else 1)
             cmdenv = parts[0]  # Assuming simple commands for mock execution
             cmd=cmdenv['args'][0]
             #print("executing: {}".format(cmdenv['line'])) #DBG
 
             alias = os.getenv(cmd)
+            self._lap(2)
             if alias is not None:
                 command=alias + command[command.find(' '):] if ' ' in command else alias
             else:
@@ -860,31 +1089,138 @@ class sh:
 
         #if cmd == 'echo':
         #    print( cmdenv['line'].split(' ', 1)[1] if ' ' in cmdenv['line'] else '') # " ".join(cmdenv['args'][1:])
-        #elif cmd == 'sort':
-        #    return "\n".join(sorted(cmdenv['args'][1:], reverse='-r' in cmdenv['sw']))
         #elif cmd == 'ls':
         #    return "file1.txt\nfile2.txt\nfile3.txt"
 
+        if len(parts) == 1 and not parts[0]['redirections']['stdout']:
+            self._spawn = spawn # pipes and > run to the end now, even with &
+
+        # pipes are faked with temp files on flash: each command's output becomes the next one's stdin
+        for i, cmdenv in enumerate(parts):
+            rd = cmdenv['redirections']
+            if cmdenv['pipe_from'] is not None:
+                rd['stdin'] = f"/.pipe{i - 1}.tmp"
+            out = rd['stdout']
+            if out is None and i < len(parts) - 1:
+                out = f"/.pipe{i}.tmp"
+            if out is None:
+                self.run_command(cmdenv)
+            else:
+                self._run_to(cmdenv, out)
+        for i in range(len(parts) - 1):
+            try:
+                os.remove(f"/.pipe{i}.tmp")
+            except OSError:
+                pass
+        return 1 # keep running
+
+
+    def _run_to(self, cmdenv, out):
+        # send everything the command prints into a file (out is {'append': path} for >>)
+        import builtins
+        oprint = builtins.print
+        mode = 'w'
+        if isinstance(out, dict):
+            out, mode = out['append'], 'a'
+        try:
+            with open(out, mode) as f:
+                def fprint(*args, **kwargs):
+                    f.write(kwargs.get('sep', ' ').join(map(str, args)) + kwargs.get('end', '\n'))
+                builtins.print = fprint
+                try:
+                    self.run_command(cmdenv)
+                finally:
+                    builtins.print = oprint
+        except OSError as e:
+            print(self.get_desc('5').format(e)) # Output file setup failed: {}
 
-        for mod in ["sh0", "sh1", "sh2"]:
-            gc.collect()
-            module = __import__(mod)
+
+    def run_command(self, cmdenv):
+        cmd = cmdenv['args'][0] if cmdenv['args'] else ''
+        for mod in ["sh0", "sh1", "sh2", "sh3", "sh4", "sh5", "sh6", "sh7", "sh8", "sh9"]:
+            hit = mod in sys.modules
+            module = self._mod(mod, False)
+            self._lap(3)
 
             # sh_module = sys.modules['sh0']
             command_function = getattr(module, cmd,None)
             if command_function:
+                self._use(mod, hit)
                 #print(f"running {mod}.{cmd}")
+                spawn, self._spawn = self._spawn, False
                 ret=command_function(self,cmdenv)  # Run the command
-                del sys.modules[mod]
+                if hasattr(ret, 'send'): # a generator: the command yields whenever it is waiting
+                    if spawn:
+                        self._spawn = ret # cmd &: _job takes it from here
+                        ret = None
+                    else:
+                        ret = self._fg(ret)
+                self._lap(4)
+                self._trim()
+                self._lap(5)
+                return ret
+            self._lap(3) # looking through modules without the command is import time too
+
+        self._trim()
+        self.err = 1
+        print(self.get_desc('0').format(cmd)) # {} command not found
+
+    def _fg(self, g):
+        # run a command that yields while it waits; the background tasks (and jobs) get a step each time it does
+        try:
+            while True:
+                next(g)
+                if self.io:
+                    self.io._bg()
+                time.sleep(0.01)
+        except StopIteration as e:
+            return e.args[0] if e.args else None
+        finally:
+            g.close() # ^C: let it clean up
+
+    def _mod(self, mod, use=True):
+        # a command module: still loaded from an earlier command (a hit), else imported (a miss).
+        # use=False while run_command only looks for a command in it (or help lists them): the LRU order and the counts are left alone.
+        # Command modules are only ever loaded through here and only unloaded by _trim, so _mods lists each loaded one once
+        hit = mod in sys.modules
+        m = sys.modules.get(mod)
+        if hit:
+            if mod not in self._mods: # imported some other way: it can be unloaded all the same
+                self._mods.insert(0, mod)
+        else:
+            if mod in self._mods:
+                self._mods.remove(mod)
+            self._trim()
+            try:
+                m = __import__(mod)
+            except MemoryError: # SH_KEEP too low (or 0, as in a script): make room and try once more
+                while self._mods:
+                    sys.modules.pop(self._mods.pop(0), None)
                 gc.collect()
-                return 1
-                # return ret
-                break
-            del sys.modules[mod]
+                m = __import__(mod)
+            self._mods.insert(0, mod) # first to go, unless a command of its own runs
+        if use:
+            self._use(mod, hit)
+        return m
+
+    def _use(self, mod, hit): # mod's command runs: count it, and make it the most recently used
+        if hit:
+            self.mhit += 1
+        else:
+            self.mmiss += 1
+        if mod in self._mods:
+            self._mods.remove(mod)
+        self._mods.append(mod)
+
+    def _trim(self):
+        # unload the least recently used command modules until more than SH_KEEP bytes are free; the last script's code goes first
+        gc.collect()
+        if self._code and gc.mem_free() < self.keep:
+            self._code = None
+            gc.collect()
+        while self._mods and gc.mem_free() < self.keep:
+            sys.modules.pop(self._mods.pop(0), None)
             gc.collect()
-
-        print(self.get_desc('0').format(cmd)) # {} command not found
-        return 1 # keep running
     
 
 
@@ -892,7 +1228,9 @@ class sh:
 # Main function to demonstrate usage
 def main():
 
+    st = _tstart()
     custom_io = CustomIO()
+    _tend("CustomIO", st)
     #custom_io.open_socket('chrisdrake.com', 9887)
     #custom_io.open_output_file('/example.txt')
     #custom_io.open_input_file('/testin.txt')
@@ -902,7 +1240,10 @@ def main():
     # Use the custom context manager to redirect stdout and stdin
     with IORedirector(custom_io):
 
-        shell = sh()
+        st = _tstart()
+        shell = sh(custom_io)
+        _tend("sh", st)
+        shell.trace = _trace
 
         # see sh1.py/test() for argument parsing tests
 
@@ -914,9 +1255,12 @@ def main():
 
         # test input
         run=1
+        custom_io._probe = _tstart()
         print("\033[s\0337\033[999C\033[999B\033[6n\r\033[u\0338", end='')  # Request terminal size.
         while run>0:
             run=1
+            if shell.jobs:
+                shell._mod('sh4')._jnote(shell)
             user_input = input(shell.subst_env("$GRN$HOSTNAME$NORM:{} cpy\$ ").format(os.getcwd())) # the stuff in the middle is the prompt
             if user_input:
                 #print("#############")
@@ -18,31 +18,34 @@ def _bare(f):
         f = f.rstrip('/')
     return f
 
-def sort(shell,cmdenv):  # 53 bytes
-    return "\n".join(sorted(cmdenv['args'][1:], reverse='-r' in cmdenv['sw']))
-
 def reboot(shell, cmdenv): # 85 bytes
     import microcontroller
+    if shell.io:
+        shell.io.flush_hist()
     print("Rebooting...")
     microcontroller.reset()
 
-def ls(shell,cmdenv):   # impliments -F -l -a -t -r -S -h
+def ls(shell,cmdenv):   # impliments -F -l -a -t -r -S -h --json
     args=cmdenv['args']
     tsort=[]
+    js=shell._js(cmdenv)
 
     def list_items(items):
         for f in sorted(items, reverse=bool(cmdenv['sw'].get('r'))):
             if (f.startswith('.') or ("/." in f and '/' not in f.split("/.")[-1])) and not cmdenv['sw'].get('a'): continue
             #print(f"f={f}")
             if not shell.file_exists(f):
-                print(shell.get_desc('12').format(cmdenv['args'][0], f))  # ls: cannot access 'sdf': No such file or directory
+                shell._say(cmdenv, shell.get_desc('12').format(cmdenv['args'][0], f))  # ls: cannot access 'sdf': No such file or directory
                 continue
             pt = os.stat(f)
-            fsize = shell.human_size(pt[6]) if cmdenv['sw'].get('h') else pt[6]
-            mtime = time.localtime(pt[7])
-            mtime_str = f"{mtime.tm_year}-{mtime.tm_mon:02}-{mtime.tm_mday:02} {mtime.tm_hour:02}:{mtime.tm_min:02}.{mtime.tm_sec:02}"
-            tag = "/" if cmdenv['sw'].get('F') and pt[0] & 0x4000 else ""
-            ret=f"{fsize:,}\t{mtime_str}\t{f}{tag}" if cmdenv['sw'].get('l') else f"{f}{tag}"
+            if js:  # {"name":"/lib/sh.py","size":51234,"mtime":1718841600,"dir":false}; sizes in bytes, times in seconds
+                ret = shell._jd({'name': f, 'size': pt[6], 'mtime': pt[7], 'dir': bool(pt[0] & 0x4000)})
+            else:
+                fsize = shell.human_size(pt[6]) if cmdenv['sw'].get('h') else pt[6]
+                mtime = time.localtime(pt[7])
+                mtime_str = f"{mtime.tm_year}-{mtime.tm_mon:02}-{mtime.tm_mday:02} {mtime.tm_hour:02}:{mtime.tm_min:02}.{mtime.tm_sec:02}"
+                tag = "/" if cmdenv['sw'].get('F') and pt[0] & 0x4000 else ""
+                ret=f"{fsize:,}\t{mtime_str}\t{f}{tag}" if cmdenv['sw'].get('l') else f"{f}{tag}"
             if cmdenv['sw'].get('t'):
                 tsort.append((pt[7], ret))
             elif cmdenv['sw'].get('S'):
@@ -64,7 +67,7 @@ def ls(shell,cmdenv):   # impliments -F -l -a -t -r -S -h
             else:
                 list_items([path])
         except OSError:
-            print(f"{path} Not found")  # Handle non-existent paths
+            shell._say(cmdenv, f"{path} Not found")  # Handle non-existent paths
 
     if cmdenv['sw'].get('t') or cmdenv['sw'].get('S'):
         for _, ret in sorted(tsort, reverse=not bool(cmdenv['sw'].get('r'))):
@@ -215,74 +218,15 @@ def df(shell, cmdenv):
         total_size = total_blocks * block_size
         free_size = free_blocks * block_size
         used_size = total_size - free_size
+        if shell._js(cmdenv):
+            print(shell._jd({'fs': '/', 'size': total_size, 'used': used_size, 'avail': free_size}))
+            return
         print(f"Filesystem Size Used Available")
         print(f"/ {shell.human_size(total_size)} {shell.human_size(used_size)} {shell.human_size(free_size)}")
     except OSError as e:
         shell._ee(cmdenv,e) # print(f"{}: {e}")
 
 
-def ping(shell, cmdenv):
-    import ipaddress
-    import socketpool
-    import wifi
-    if len(cmdenv['args']) < 2:
-        #print("usage: ping <address>")
-        print(shell.get_desc('14')) # usage: ping <address>
-        return
-
-    dom = cmdenv['args'][1]
-
-    pool = socketpool.SocketPool(wifi.radio)
-
-    try:
-        addr_info = pool.getaddrinfo(dom, 80)  # Using port 80 for HTTP
-        ip = addr_info[0][4][0]
-        ip1 = ipaddress.ip_address(ip)
-    except Exception as e:
-        #print(f'Error getting IP address: {e}') # saves 21 bytes
-        print(shell.get_desc('15').format(e)) # Error getting IP address: {e}
-        return
-
-    #print(f"PING {dom} ({ip}) 56(84) bytes of data.")
-    print(shell.get_desc('16').format(dom,ip)) # PING {dom} ({ip}) 56(84) bytes of data.
-    
-    packet_count = 4
-    transmitted = 0
-    received = 0
-    total_time = 0
-    times = []
-
-    for seq in range(1, packet_count + 1):
-        transmitted += 1
-        start_time = time.monotonic()
-        
-        result = wifi.radio.ping(ip1)
-        rtt = (time.monotonic() - start_time) * 1000  # Convert to milliseconds
-        total_time += rtt
-        
-        if result is not None:
-            received += 1
-            times.append(rtt)
-            print(f"64 bytes from {ip}: icmp_seq={seq} time={rtt:.1f} ms")
-        else:
-            #print(f"Request timeout for icmp_seq {seq}")
-            print(shell.get_desc('17').format(seq)) # Request timeout for icmp_seq {seq}
-        
-        if rtt<1000 and seq<packet_count:
-            time.sleep((1000-rtt)/1000)
-
-    #print(f"--- {ip} ping statistics ---\n{transmitted} packets transmitted, {received} received, {((transmitted - received) / transmitted) * 100:.0f}% packet loss, time {total_time:.0f}ms")
-    print(shell.get_desc('18').format(ip,transmitted,received,((transmitted - received) / transmitted) * 100,total_time)) # --- {ip} ping statistics ---\n{transmitted} packets transmitted, {received} received, {((transmitted - received) / transmitted) * 100:.0f}% packet loss, time {total_time:.0f}ms
-
-    if times:
-        min_time = min(times)
-        avg_time = sum(times) / len(times)
-        max_time = max(times)
-        mdev_time = (sum((x - avg_time) ** 2 for x in times) / len(times)) ** 0.5
-        #print(f"rtt min/avg/max/mdev = {min_time:.3f}/{avg_time:.3f}/{max_time:.3f}/{mdev_time:.3f} ms")
-        print(shell.get_desc('19').format(min_time,avg_time,max_time,mdev_time)) # rtt min/avg/max/mdev = {min_time:.3f}/{avg_time:.3f}/{max_time:.3f}/{mdev_time:.3f} ms
-
-
 def clear(shell, cmdenv):
     print("\033[2J\033[H", end='')  # ANSI escape codes to clear screen
 
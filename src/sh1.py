@@ -9,7 +9,6 @@ __version__ = '1.0.20240626'  # Major.Minor.Patch
 # it is separate to save RAM
 
 import gc
-import sys
 import os
 
 
@@ -26,34 +25,19 @@ def man(shell,cmdenv):
         print(shell.get_desc('2'))                       # "Usage: man [keyword]"
 
 
-def _iter_cmds():
-    for mod in ["sh0", "sh1", "sh2"]:
-        gc.collect()
-        module = __import__(mod)
+def _iter_cmds(shell):  # every command name; the modules are loaded through the shell's cache, which unloads them as memory needs
+    for mod in ["sh0", "sh1", "sh2", "sh3", "sh4", "sh5", "sh6", "sh7", "sh8", "sh9"]:
+        module = shell._mod(mod, False)
         for name in dir(module):
             if not name.startswith("_"):
                 obj = getattr(module, name)
                 if callable(obj):
                     yield name
-        if mod != "sh1":
-            del sys.modules[mod]
-        gc.collect()
 
 
 def help(shell, cmdenv):
     try:
-        commands = []
-        for mod in ["sh0", "sh1", "sh2"]:
-            gc.collect()
-            module = __import__(mod)
-            for name in dir(module):
-                if not name.startswith("_"):
-                    obj = getattr(module, name)
-                    if callable(obj):
-                        commands.append(name)
-            if mod != "sh1":
-                del sys.modules[mod]
-            gc.collect()
+        commands = list(_iter_cmds(shell))
 
         if cmdenv.get('args', [])[1:] == ["all"]:
             for cmd in sorted(commands):
@@ -137,156 +121,104 @@ def test(shell,cmdenv):
     return "ok\n"
 
 
-def run(shell,cmdenv):
-    if len(cmdenv['args']) < 2:
-        shell._ea(cmdenv)
-        return
-
-    file_path = cmdenv['args'][1]
-
-    in_docstring = False
-    block = ""
-    extra_iteration = False
-
-    with open(file_path, 'r') as f:
-        while True:
-            if not extra_iteration:
-                line = f.readline()
-                if not line:
-                    extra_iteration = True
-                    line = '\n'  # Trigger the final block execution
-            else:
+def _units(f):
+    # the file as top level statements (with their decorators, bodies and else/except/finally parts): yields (first line - 1, source)
+    unit = []
+    start = n = depth = 0  # depth: open brackets
+    q = None  # the open string's quote, if a string runs past the end of a line
+    cont = deco = False  # last line ended with a backslash / last statement was a decorator
+    for line in f:
+        top = not (depth > 0 or q or cont) and line[:1] not in ' \t\r\n#'  # a statement at the left margin
+        if top and unit and not deco and line.split(None, 1)[0].split(':')[0] not in ('else', 'elif', 'except', 'finally'):
+            yield start, ''.join(unit)
+            unit = []
+        if top:
+            deco = line[0] == '@'
+        if not unit:
+            start = n
+        unit.append(line)
+        n += 1
+        i = 0
+        while i < len(line):
+            c = line[i]
+            if q:
+                if c == '\\':
+                    i += 1
+                elif line.startswith(q, i):
+                    i += len(q) - 1
+                    q = None
+            elif c == '#':
                 break
-
-            stripped_line = line.strip()
-
-            if in_docstring:
-                if stripped_line.endswith('"""') or stripped_line.endswith("'''"):
-                    in_docstring = False
-                continue
-
-            if stripped_line.startswith('"""') or stripped_line.startswith("'''"):
-                in_docstring = True
-                continue
-
-            if '#' in line:
-                line = line.split('#', 1)[0]
-
-            if line.strip():
-                block += line + '\n'
-                try:
-                    exec(block)
-                    block = ""
-                except SyntaxError:
-                    # If compile fails, continue adding lines to the block
-                    continue
-                #except Exception as e:
-                #    print(f"Error executing block: {e}")
-                #    break
-
-
-def run2(shell, cmdenv):
+            elif c in '\'"':
+                q = c * 3 if line.startswith(c * 3, i) else c
+                i += len(q) - 1
+            elif c in '([{':
+                depth += 1
+            elif c in ')]}':
+                depth -= 1
+            i += 1
+        cont = line.rstrip('\r\n').endswith('\\')
+        if q and len(q) == 1 and not cont:
+            q = None  # unterminated: let compile() report it
+    if unit:
+        yield start, ''.join(unit)
+
+
+def _script(shell, cmdenv, whole):
+    # compile the file once - all of it, or one top level statement at a time (to fit bigger programs in RAM) - and run it.
+    # The code is kept on the shell, so running an unchanged file again skips compiling, unless it left too little RAM free
     if len(cmdenv['args']) < 2:
         shell._ea(cmdenv)
         return
+    path = cmdenv['args'][1]
+    try:
+        st = os.stat(path)
+    except OSError as e:
+        shell._ee(cmdenv, e)
+        return
+    key = (path if path[0] == '/' else os.getcwd().rstrip('/') + '/' + path, st[8], st[6])
+    g = {'__name__': '__main__', '__file__': key[0]}
+    c = shell._code
+    if c and c[0] == key:
+        for code in c[1]:
+            exec(code, g)
+        return
+    shell._code = c = None  # the last script's code goes before we compile another
+    gc.collect()
+    codes = []
+    if whole:
+        try:
+            with open(path) as f:
+                codes.append(compile(f.read(), path, 'exec'))
+        except MemoryError:
+            codes = []
+            gc.collect()
+    if codes:
+        exec(codes[0], g)
+        g = None
+        gc.collect()
+        if gc.mem_free() >= shell.keep:  # kept only while there is room, as run2 does
+            shell._code = (key, codes)
+        return
+    with open(path) as f:
+        for n, src in _units(f):
+            code = compile('\n' * n + src, path, 'exec')  # padded so errors give the file's line numbers
+            src = None
+            if codes is not None:
+                codes.append(code)
+                if gc.mem_free() < shell.keep:
+                    codes = None  # too big to keep
+            exec(code, g)
+    if codes is not None:
+        shell._code = (key, codes)
 
-    file_path = cmdenv['args'][1]
-
-    in_docstring = False
-    block = ""
-    extra_iteration = False
-    open_brackets = 0
-    open_parentheses = 0
-    open_braces = 0
-    in_quote = False
-    quote_char = ''
-
-    def is_in_string(line, in_quote, quote_char):
-        escape = False
-        for char in line:
-            if char == '\\' and not escape:
-                escape = True
-            elif char == quote_char and not escape:
-                in_quote = not in_quote
-            else:
-                escape = False
-        return in_quote
-
-    with open(file_path, 'r') as f:
-        while True:
-            if not extra_iteration:
-                line = f.readline()
-                if not line:
-                    extra_iteration = True
-                    line = '\n'  # Trigger the final block execution
-            else:
-                break
-
-            stripped_line = line.strip()
-
-            # Handle docstrings
-            if in_docstring:
-                if stripped_line.endswith('"""') or stripped_line.endswith("'''"):
-                    in_docstring = False
-                continue
-
-            if stripped_line.startswith('"""') or stripped_line.startswith("'''"):
-                in_docstring = True
-                continue
-
-            # Check for string literals and handle comments safely
-            if not in_quote:
-                temp_line = ''
-                for i, char in enumerate(line):
-                    if char in ('"', "'"):
-                        if not in_quote:
-                            in_quote = True
-                            quote_char = char
-                        elif quote_char == char and (i == 0 or line[i-1] != '\\'):
-                            in_quote = False
-                    if not in_quote and char == '#':
-                        temp_line = line[:i]
-                        break
-                    temp_line += char
-                line = temp_line
-
-            # Remove trailing comments outside string literals
-            stripped_line = line.strip()
-            
-            if not stripped_line and not extra_iteration:
-                continue
-
-            block += line
-
-            # Track open quotes
-            in_quote = is_in_string(line, in_quote, quote_char)
-
-            if in_quote:
-                continue
-
-            # Track open brackets
-            open_brackets += line.count('[') - line.count(']')
-            open_parentheses += line.count('(') - line.count(')')
-            open_braces += line.count('{') - line.count('}')
-
-            # Check if the line ends with a backslash indicating continuation
-            if stripped_line.endswith('\\'):
-                continue
 
-            # If we are inside a block, we shouldn't execute yet
-            if open_brackets > 0 or open_parentheses > 0 or open_braces > 0 or stripped_line.endswith(':'):
-                continue
+def run(shell, cmdenv):  # compiles the whole file, one statement at a time if that runs out of memory
+    _script(shell, cmdenv, True)
 
-            try:
-                exec(block)
-                block = ""
-            except SyntaxError:
-                # If compile fails, continue adding lines to the block
-                continue
-            #except Exception as e: # this interferes with errors in the original code
-            #    print(f"Error executing block: {e}")
-            #    break
 
+def run2(shell, cmdenv):  # one top level statement at a time: for programs too big to compile at once
+    _script(shell, cmdenv, False)
 
 
 def cat(shell, cmdenv):
@@ -306,7 +238,7 @@ def cat(shell, cmdenv):
 
 
 def _write_toml(shell, key, value=None):
-    import sh0  # load mv command
+    sh0 = shell._mod('sh0', False)  # load mv command
     ifn = '/settings.toml'
     tmp = '/settings_new.toml'
 
@@ -356,7 +288,8 @@ def _write_toml(shell, key, value=None):
                             if value[0] in '+-.0123456789"\'': # Update the variable
                                 line = f'{key} = {value}\n'
                             else:
-                                line = f'{key} = "{value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\t", "\\t")}"\n' 
+                                value = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\t", "\\t")
+                                line = f'{key} = "{value}"\n'
                             key=None
 
             in_multiline = False
@@ -369,7 +302,6 @@ def _write_toml(shell, key, value=None):
     # Replace old settings with the new settings
     sh0.mv(shell, {'sw': {}, 'args': ['mv', ifn, '/settings_old.toml']})
     sh0.mv(shell, {'sw': {}, 'args': ['mv', tmp, ifn]})
-    del sys.modules['sh0']
 
 
 def alias(shell, cmdenv):
@@ -10,9 +10,7 @@ __version__ = '1.0.20240626'  # Major.Minor.Patch
 
 import gc
 import time
-import wifi
 #import ipaddress
-import socketpool
 
 
 def free(shell, cmdenv):
@@ -21,6 +19,9 @@ def free(shell, cmdenv):
         total_memory = gc.mem_alloc() + gc.mem_free()
         free_memory = gc.mem_free()
         used_memory = gc.mem_alloc()
+        if shell._js(cmdenv):
+            print(shell._jd({'total': total_memory, 'used': used_memory, 'free': free_memory}))
+            return
         print(f"Total Memory: {total_memory} bytes")
         print(f"Used Memory: {used_memory} bytes")
         print(f"Free Memory: {free_memory} bytes")
@@ -28,44 +29,27 @@ def free(shell, cmdenv):
         shell._ee(cmdenv, e)  # print(f"free: {e}")
 
 
-def wc(shell, cmdenv):
-    if len(cmdenv['args']) < 2:
-        shell._ea(cmdenv)  # print("wc: missing file operand")
-    else:
-        path = cmdenv['args'][1]
-        try:
-            with open(path, 'rb') as file:
-                lines = 0
-                words = 0
-                bytes_count = 0
-                while True:
-                    chunk = file.read(512)
-                    if not chunk:
-                        break
-                    lines += chunk.count(b'\n')
-                    words += len(chunk.split())
-                    bytes_count += len(chunk)
-                print(f"{lines} {words} {bytes_count} {path}")
-        except Exception as e:
-            shell._ee(cmdenv, e)  # print(f"wc: {e}")
-
-
-
 def history(shell, cmdenv):
+    if shell.io:
+        shell.io.flush_hist()
+    js = shell._js(cmdenv)
     try:
         with open("/.history.txt", "r") as file:
             for index, line in enumerate(file, start=1):
                 parts = line.strip().split("\t")
                 if len(parts) < 2:
                     continue
+                if js:
+                    print(shell._jd({'n': index, 'time': int(parts[0]), 'cmd': parts[1]}))
+                    continue
                 date_time = time.localtime(int(parts[0]))
                 print(f"{index}\t{date_time.tm_year}-{date_time.tm_mon:02}-{date_time.tm_mday:02} {date_time.tm_hour:02}:{date_time.tm_min:02}.{date_time.tm_sec:02}\t{parts[1]}")
 
     except Exception as e:
-        print(f"Error reading history: {e}")
+        shell._say(cmdenv, f"Error reading history: {e}")
 
 
-def _show_mdns():
+def _show_mdns(shell, js):
     import wifi
     import mdns
 
@@ -75,8 +59,9 @@ def _show_mdns():
     # Retrieve the hostname
     mdns_name = mdns_server.hostname
 
-    # Print the mDNS hostname
-    print(f"mDNS Hostname: {mdns_name}")
+    # Print the mDNS hostname (the interface record has it already)
+    if not js:
+        print(f"mDNS Hostname: {mdns_name}")
 
     # Find services advertised by this hostname
     # services = mdns_server.find(service_type="_services._dns-sd._udp", protocol="_udp", timeout=1.0)
@@ -85,7 +70,11 @@ def _show_mdns():
 
 
     # Print the found services
-    if services:
+    if js:
+        for service in services or ():
+            print(shell._jd({'service': service.instance_name, 'hostname': service.hostname, 'address': str(service.ipv4_address),
+                             'port': service.port, 'type': service.service_type, 'protocol': service.protocol, 'us': service.hostname == mdns_name}))
+    elif services:
         for service in services:
             if service.hostname == mdns_name:
                 print(f"### US ###")
@@ -114,8 +103,18 @@ def ifconfig(shell, cmdenv):
     mdns_server = mdns.Server(wifi.radio)
     mdnshostname=mdns_server.hostname
 
-    # Format MAC address
+    ap = wifi.radio.ap_info
+
+    # Format MAC addresses
     mac_address_str = ':'.join(['{:02x}'.format(b) for b in mac_address])
+    bssid = ':'.join([f'{b:02x}' for b in ap.bssid])
+
+    if shell._js(cmdenv):  # the interface, then one record per mDNS service
+        print(shell._jd({'if': 'wifi0', 'inet': str(ip4_address), 'netmask': str(netmask), 'gateway': str(gateway), 'ether': mac_address_str,
+                         'hostname': hostname, 'mdns': mdnshostname, 'dns': str(dns), 'tx_power': tx_power,
+                         'ssid': ap.ssid, 'bssid': bssid, 'channel': ap.channel, 'country': ap.country, 'rssi': ap.rssi}))
+        _show_mdns(shell, True)
+        return
 
     # Print network interface details
     print(f"wifi0: inet {ip4_address}  netmask {netmask}  gateway {gateway}")
@@ -124,13 +123,12 @@ def ifconfig(shell, cmdenv):
     #if dns:
     print(f"\tDNS: {dns}")
     print(f"\tTX power: {tx_power} dBm")
-    print(f"\tSSID: {wifi.radio.ap_info.ssid}")
-    print("\tBSSID: {}".format(':'.join([f'{b:02x}' for b in wifi.radio.ap_info.bssid])))
-    #print(':'.join([f'{b:02x}' for b in wifi.radio.ap_info.bssid]))
-    print(f"\tChannel: {wifi.radio.ap_info.channel}")
-    print(f"\tCountry: {wifi.radio.ap_info.country}")
-    print(f"\tRSSI: {wifi.radio.ap_info.rssi}")
-    _show_mdns()
+    print(f"\tSSID: {ap.ssid}")
+    print(f"\tBSSID: {bssid}")
+    print(f"\tChannel: {ap.channel}")
+    print(f"\tCountry: {ap.country}")
+    print(f"\tRSSI: {ap.rssi}")
+    _show_mdns(shell, False)
     #del sys.modules["mdns"] # done. save space now.
 
 
@@ -140,11 +138,13 @@ def date(shell, cmdenv):
     print(f"{date_time.tm_year}-{date_time.tm_mon:02}-{date_time.tm_mday:02} {date_time.tm_hour:02}:{date_time.tm_min:02}.{date_time.tm_sec:02}")
 
 
-def sleep(shell, cmdenv): # not working
+def sleep(shell, cmdenv): # yields until the time is up, so it can run as a job (sleep 60 &)
     if len(cmdenv['args']) < 2:
         shell._ea(cmdenv)
         return
-    time.sleep(float(cmdenv['args'][1]))
+    t = time.monotonic() + float(cmdenv['args'][1])
+    while time.monotonic() < t:
+        yield
 
 
 def _sleep(shell, cmdenv): # not working
@@ -169,144 +169,76 @@ def uptime(shell, cmdenv):
     print(f"Uptime: {int(t // 3600)} hours, {int((t % 3600) // 60)} minutes, {int(t % 60)} seconds")
 
 
-def _parse_url(url):
-    if "://" not in url:
-        url = "http://" + url
-    protocol, _, host_path = url.partition("://")
-    if "/" in host_path:
-        host, path = host_path.split("/", 1)
-        path = "/" + path
-    else:
-        host = host_path
-        path = "/"
-    
-    if ":" in host:
-        host, port = host.split(":")
-        port = int(port)
-    else:
-        port = 80 if protocol == "http" else 443
-
-    return protocol, host, port, path
-
+def trace(shell, cmdenv):  # the startup trace, recorded when SH_TRACE is set
+    if shell.trace is None:
+        print("trace: set SH_TRACE=1 in settings.toml and reboot")
+        return
+    for phase, ms, nbytes in shell.trace:
+        print(f"{phase:<18}{ms:>10.1f} ms{nbytes:>9} bytes")
 
 
-def curl(shell, cmdenv):
+def stats(shell, cmdenv):  # loaded modules, and the command profile ring buffer (SH_PROF=n in settings.toml, or "time <cmd>"); -c clears it
+    print(f"modules: {' '.join(shell._mods)} loaded, {shell.mhit} hits, {shell.mmiss} misses, unloaded below {shell.keep} bytes free")
+    p = shell.prof
+    if not p:
+        print("stats: set SH_PROF=16 in settings.toml, or run time <command>")
+        return
+    if cmdenv['sw'].get('c'):
+        shell.prof = [None] * len(p)
+        shell._pn = 0
+        shell.mhit = shell.mmiss = 0
+        return
+    n = min(shell._pn, len(p))
+    tot = [0] * 8
+    print("    real   parse   alias  import     run  unload    peak   delta  (ms, bytes)")
+    for i in range(shell._pn - n, shell._pn):  # oldest first
+        r = p[i % len(p)]
+        line = ''
+        for j in range(1, 9):
+            tot[j - 1] += r[j]
+            line += f"{r[j] / 1000:8.1f}" if j < 7 else f"{r[j]:8}"
+        print(line + '  ' + r[0])
+    if n > 1:
+        print(''.join(f"{v / n / 1000:8.1f}" if j < 6 else f"{v // n:8}" for j, v in enumerate(tot)) + '  average of ' + str(n))
+
+
+def source(shell, cmdenv):  # run the commands in a file, without prompt or echo; -e (or "set -e" in the file) stops at the first error
     if len(cmdenv['args']) < 2:
-        print("usage: curl [-I] [-i] [--data=data] <url>")
+        shell._ea(cmdenv)
         return
-
-    import ssl
-    url = cmdenv['args'][-1]
-    method = "GET"
-    headers = {"Host": "", "Connection": "close"}
-    data = None
-    include_headers = cmdenv['sw'].get('i', False)
-
-    # Parse command line arguments
-    if cmdenv['sw'].get('I'):
-        method = "HEAD"
-        include_headers = True
-    if cmdenv['sw'].get('data'):
-        data = cmdenv['sw']['data']
-        method = "POST"
-        headers["Content-Type"] = "application/x-www-form-urlencoded"
-        headers["Content-Length"] = str(len(data))
-
-    # Parse the URL
-    protocol, host, port, path = _parse_url(url)
-    headers["Host"] = host
-
+    path = cmdenv['args'][1]
+    stop = cmdenv['sw'].get('e', False)
+    keep = shell.keep
+    shell.keep = 0  # command modules stay loaded until the script ends
+    n = 0
     try:
-        # Create a socket pool
-        pool = socketpool.SocketPool(wifi.radio)
-
-        # Create a socket and connect
-        addr_info = pool.getaddrinfo(host, port)[0]
-        addr = addr_info[4]
-        sock = pool.socket(addr_info[0], addr_info[1], addr_info[2])
-        sock.connect(addr)
-
-        # Wrap socket with SSL if using HTTPS
-        if protocol == 'https':
-            context = ssl.create_default_context()
-            sock = context.wrap_socket(sock, server_hostname=host)
-
-        # Construct the HTTP request
-        request_lines = [f"{method} {path} HTTP/1.1"]
-        request_lines.extend(f"{header}: {value}" for header, value in headers.items())
-        request_lines.append("")  # End of headers
-        request_lines.append(data if data else "")  # Data for POST
-        request = "\r\n".join(request_lines) + "\r\n"
-
-        # Send HTTP request
-        sock.send(request.encode('utf-8'))
-
-        # Receive and print response headers
-        response = b""
-        buffer = bytearray(1024)
-        while True:
-            nbytes = sock.recv_into(buffer)
-            if nbytes == 0:
-                break
-            response += buffer[:nbytes]
-            if b'\r\n\r\n' in response:
-                break
-
-        response_str = response.decode('utf-8')
-        headers, body= response_str.split('\r\n\r\n', 1)
-        if include_headers:
-            print(headers)
-            print()
-
-
-        # Check for chunked transfer encoding
-        if "Transfer-Encoding: chunked" in headers:
-            # Process the initial part of the body
-            while body:
-                length_str, body = body.split('\r\n', 1)
-                chunk_length = int(length_str, 16)
-                if chunk_length == 0:
-                    break
-
-                # Ensure we have enough data to read the entire chunk
-                while len(body) < chunk_length:
-                    nbytes = sock.recv_into(buffer)
-                    if nbytes == 0:
-                        break
-                    body += buffer[:nbytes].decode('utf-8')
-
-                # Print the chunk data
-                chunk_data = body[:chunk_length]
-                print(chunk_data, end='')
-
-                # Move to the next chunk, skipping the trailing \r\n
-                body = body[chunk_length + 2:]
-
-                # If body is empty, read more data
-                if not body:
-                    nbytes = sock.recv_into(buffer)
-                    if nbytes == 0:
-                        break
-                    body += buffer[:nbytes].decode('utf-8')
-
-        else:
-            # Print the initial part of the body
-            print(body, end='')
-
-            # Read and print the remaining non-chunked data
+        with open(path) as f:
             while True:
-                nbytes = sock.recv_into(buffer)
-                if nbytes == 0:
+                line = f.readline()  # one line at a time: the script is never all in RAM
+                if not line:
                     break
-                print(buffer[:nbytes].decode('utf-8'), end='')
-
-        # Close the socket
-        sock.close()
-
-    except Exception as e:
-        print(f"Error fetching {url}: {e}")
-
+                n += 1
+                line = line.strip()
+                if not line or line[0] == '#':
+                    continue
+                if line in ('set -e', 'set +e'):
+                    stop = line[4] == '-'
+                    continue
+                shell.err = 0
+                try:
+                    if not shell.execute_command(line):
+                        break  # exit ends the script, not the shell
+                except Exception as e:
+                    shell._ee(cmdenv, e)
+                if shell.err and stop:
+                    print(shell.get_desc('23').format(path, n, line))  # {}: line {}: {}: stopped on error
+                    shell.err = 1  # so a script that sourced this one stops too
+                    break
+    except OSError as e:
+        shell._ee(cmdenv, e)
+    finally:
+        shell.keep = keep
 
-def wget(shell, cmdenv):
-    return curl(shell, cmdenv)
 
+def sh(shell, cmdenv):  # sh file: same as source
+    source(shell, cmdenv)
@@ -0,0 +1,266 @@
+# sh3.py
+
+__version__ = '1.0.20240626'  # Major.Minor.Patch
+
+# Created by Chris Drake.
+# Linux-like shell interface for CircuitPython.  https://github.com/gitcnd/cpy_shell
+#
+# This is a separate module for holding some commands.
+# it is separate to save RAM
+
+import os
+import sys
+import time
+from array import array
+
+
+def _tail_pos(f, n, bs=256):
+    # seek backwards from EOF one block at a time (like search_history) and return the offset where the last n lines start
+    f.seek(0, 2)
+    pos = f.tell()
+    count = 0
+    last = True
+    while pos > 0 and n > 0:
+        rd = min(bs, pos)
+        pos -= rd
+        f.seek(pos)
+        blk = f.read(rd)
+        i = rd
+        if last:
+            last = False
+            if blk[-1:] == b'\n':
+                i -= 1  # the final newline does not start another line
+        while True:
+            i = blk.rfind(b'\n', 0, i)
+            if i < 0:
+                break
+            count += 1
+            if count == n:
+                return pos + i + 1
+    return pos if n > 0 else f.tell()
+
+
+def _follow(shell, cmdenv, paths, offs, outs):
+    # poll the file sizes and only read what got appended; back off while nothing changes
+    idle = 0.1
+    cur = paths[-1]
+    while True:
+        grew = False
+        for k, path in enumerate(paths):
+            try:
+                size = os.stat(path)[6]
+            except OSError:
+                continue
+            if size < offs[k]:
+                print(shell.get_desc('20').format(cmdenv['args'][0], path))  # tail: x.txt: file truncated
+                offs[k] = 0
+            if size > offs[k]:
+                grew = True
+                if path != cur and len(paths) > 1:
+                    print(f"\n==> {path} <==")
+                    cur = path
+                with open(path, 'rb') as f:  # re-open, the size of an already open file is not refreshed
+                    f.seek(offs[k])
+                    while offs[k] < size:
+                        chunk = f.read(min(512, size - offs[k]))
+                        if not chunk:
+                            break
+                        offs[k] += len(chunk)
+                        outs[k](chunk)  # a writer may be half way through a character
+        if grew:
+            idle = 0.1
+        else:
+            t = time.monotonic() + idle
+            while time.monotonic() < t:
+                yield  # let the rest of the shell run meanwhile (tail -f log &)
+            idle = min(idle * 2, 1.0)
+
+
+def tail(shell, cmdenv):  # impliments -n -f ; a generator, for -f
+    try:
+        n = int(shell._swv(cmdenv, 'n', 10))
+    except ValueError as e:
+        shell._ee(cmdenv, e)  # print(f"tail: {e}")
+        return
+    paths = cmdenv['args'][1:] or [shell._stdin(cmdenv)]
+    if paths == [None]:
+        shell._ea(cmdenv)  # print("tail: missing file operand")
+        return
+    offs = [0] * len(paths)
+    outs = [shell._u8() for _ in paths]
+    for k, path in enumerate(paths):
+        if len(paths) > 1:
+            print(f"{'' if k == 0 else chr(10)}==> {path} <==")
+        try:
+            with open(path, 'rb') as f:
+                f.seek(_tail_pos(f, n))
+                while True:
+                    line = f.readline()
+                    if not line:
+                        break
+                    outs[k](line)
+                offs[k] = f.tell()
+        except OSError as e:
+            shell._ee(cmdenv, e)  # print(f"tail: {e}")
+    if cmdenv['sw'].get('f') and len(cmdenv['args']) > 1:  # a pipe has ended by now: nothing to follow
+        yield from _follow(shell, cmdenv, paths, offs, outs)
+
+
+class _LineIdx:
+    # sparse index of line start offsets: remembers every k'th line as we read forward, so any line is at most k-1 readline()s away
+    def __init__(self, f, k=32):
+        self.f = f
+        self.k = k
+        self.idx = array('L', [0])
+        self.n = 0    # lines scanned so far
+        self.pos = 0  # offset of line self.n
+        self.eof = False
+
+    def _grow(self, ln):
+        self.n += 1
+        self.pos += ln
+        if self.n % self.k == 0:
+            self.idx.append(self.pos)
+
+    def seek(self, line):  # position the file at the start of line; returns the line actually reached
+        if line > self.n:
+            self.f.seek(self.pos)
+            while self.n < line:
+                l = self.f.readline()
+                if not l:
+                    self.eof = True
+                    break
+                self._grow(len(l))
+            return self.n
+        b = line // self.k
+        self.f.seek(self.idx[b])
+        for _ in range(line - b * self.k):
+            self.f.readline()
+        return line
+
+    def lines(self, line):
+        line = self.seek(line)
+        while True:
+            l = self.f.readline()
+            if not l:
+                if line == self.n:
+                    self.eof = True
+                return
+            if line == self.n:
+                self._grow(len(l))
+            yield line, l
+            line += 1
+
+
+def _key():
+    c = sys.stdin.read(1)
+    if c == '\x1b' and sys.stdin.read(1) == '[':
+        c = sys.stdin.read(1)
+        if c in '56':
+            sys.stdin.read(1)  # ~
+            return 'b' if c == '5' else ' '
+        return {'A': 'k', 'B': 'j'}.get(c, '~')
+    return c
+
+
+def _ask(prompt):  # read a line at the status line, echoing as we go
+    s = ''
+    print(f"\r\033[K{prompt}", end='')
+    while True:
+        c = sys.stdin.read(1)
+        if c in '\r\n':
+            return s
+        if c in '\x7f\b':
+            if s:
+                s = s[:-1]
+                print('\b \b', end='')
+        elif c == '\x1b':
+            return None
+        else:
+            s += c
+            print(c, end='')
+
+
+def _page(shell, li, top, rows, cols):  # draw one screen from line top; returns the number of lines shown
+    print("\033[2J\033[H", end='')
+    used = shown = 0
+    for _, l in li.lines(top):
+        t = shell._dec(l.rstrip(b'\r\n'))
+        h = max(1, (len(t) + cols - 1) // cols)
+        if used + h > rows:
+            if shown:
+                break
+            t = t[:rows * cols]
+            h = rows
+        print(t)
+        used += h
+        shown += 1
+        if used >= rows:
+            break
+    return shown
+
+
+def more(shell, cmdenv):  # also less.  keys: space/f b j k g G /pattern n <N>g q
+    if len(cmdenv['args']) < 2:
+        shell._ea(cmdenv)  # print("more: missing file operand")
+        return
+    io = shell.io
+    rows = (io._TERM_HEIGHT if io else 24) - 1
+    cols = io._TERM_WIDTH if io else 80
+    less = cmdenv['args'][0] == 'less'
+    path = cmdenv['args'][1]
+    try:
+        size = os.stat(path)[6]
+        with open(path, 'rb') as f:
+            li = _LineIdx(f)
+            top = 0
+            pat = None
+            num = ''
+            while True:
+                shown = _page(shell, li, top, rows, cols)
+                end = li.eof and top + shown >= li.n
+                if end and not less:
+                    return
+                pct = 100 if end or not size else f.tell() * 100 // size
+                print(f"\033[7m{'(END)' if end else (path if less else '--More--')} ({pct}%)\033[0m", end='')
+                while True:
+                    c = _key()
+                    if c.isdigit():
+                        num += c
+                        continue
+                    break
+                if c in 'q\x03':
+                    break
+                elif c in ' f':
+                    top += shown if not end else 0
+                elif c == 'b':
+                    top = max(0, top - rows)
+                elif c in 'j\r\n':
+                    top += 0 if end else 1
+                elif c == 'k':
+                    top = max(0, top - 1)
+                elif c == 'g':
+                    top = li.seek(max(0, int(num) - 1)) if num else 0
+                elif c == 'G':
+                    li.seek(1 << 30)
+                    top = max(0, li.n - rows)
+                elif c in '/n':
+                    if c == '/':
+                        pat = _ask('/')
+                    if pat:
+                        p = pat.encode('utf-8')
+                        for no, l in li.lines(top + 1):
+                            if p in l:
+                                top = no
+                                break
+                        else:
+                            print("\r\033[KPattern not found", end='')
+                            _key()
+                num = ''
+            print("\r\033[K", end='')
+    except OSError as e:
+        shell._ee(cmdenv, e)  # print(f"more: {e}")
+
+
+def less(shell, cmdenv):
+    more(shell, cmdenv)  # more knows to stay open at the end if that was the command.
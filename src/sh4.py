@@ -0,0 +1,306 @@
+# sh4.py
+
+__version__ = '1.0.20240626'  # Major.Minor.Patch
+
+# Created by Chris Drake.
+# Linux-like shell interface for CircuitPython.  https://github.com/gitcnd/cpy_shell
+#
+# This is a separate module for holding some commands.
+# it is separate to save RAM
+
+import gc
+import os
+
+
+def _keyfn(cmdenv, shell):
+    # build the sort key from -k N[,M] (1-based fields, split on -t or whitespace) and -n
+    sep = shell._swv(cmdenv, 't')
+    k = shell._swv(cmdenv, 'k')
+    num = cmdenv['sw'].get('n')
+    a, b = 0, 0
+    if k:
+        k = k.split(',')
+        a = int(k[0]) - 1
+        b = int(k[1]) if len(k) > 1 else 0
+
+    def key(line):
+        s = line.rstrip('\r\n')
+        if k:
+            f = s.split(sep)
+            s = (sep or ' ').join(f[a:b] if b else f[a:])
+        if num:
+            s = s.strip()
+            i = 0
+            while i < len(s) and (s[i] in '0123456789.' or (i == 0 and s[i] in '+-')):
+                i += 1
+            try:
+                return float(s[:i])
+            except ValueError:
+                return 0.0
+        return s
+    return key
+
+
+def _sift(h, i, lt):  # move h[i] down into place in the heap
+    n = len(h)
+    while True:
+        c = 2 * i + 1
+        if c >= n:
+            return
+        if c + 1 < n and lt(h[c + 1], h[c]):
+            c += 1
+        if not lt(h[c], h[i]):
+            return
+        h[i], h[c] = h[c], h[i]
+        i = c
+
+
+def _merge(runs, key, lt, out, uniq):
+    # k-way merge of sorted run files through a heap of [key, run, line, file]
+    h = []
+    for r, path in enumerate(runs):
+        f = open(path, 'r')
+        line = f.readline()
+        if line:
+            h.append([key(line), r, line, f])
+        else:
+            f.close()
+    for i in range(len(h) // 2 - 1, -1, -1):
+        _sift(h, i, lt)
+    last = None
+    while h:
+        top = h[0]
+        if not (uniq and top[0] == last):
+            out(top[2])
+        last = top[0]
+        line = top[3].readline()
+        if line:
+            top[0], top[2] = key(line), line
+        else:
+            top[3].close()
+            h[0] = h[-1]
+            h.pop()
+        if h:
+            _sift(h, 0, lt)
+    for path in runs:
+        os.remove(path)
+
+
+def sort(shell, cmdenv):  # impliments -r -n -k -t -u -S ; external merge sort, runs spill to flash
+    rev = bool(cmdenv['sw'].get('r'))
+    uniq = cmdenv['sw'].get('u')
+    paths = cmdenv['args'][1:] or [shell._stdin(cmdenv)]
+    if paths == [None]:
+        shell._ea(cmdenv)  # print("sort: missing file operand")
+        return
+    lt = lambda x, y: (x[0] > y[0] if rev else x[0] < y[0]) or (x[0] == y[0] and x[1] < y[1])
+    runs = []
+    buf = []
+    used = 0
+
+    def spill(lines, path):
+        with open(path, 'w') as f:
+            _emit(lines, key, f.write, uniq)
+        runs.append(path)
+
+    try:
+        key = _keyfn(cmdenv, shell)  # a bad -k or -S goes to _ee like any other error
+        gc.collect()
+        budget = int(shell._swv(cmdenv, 'S', 0) or gc.mem_free() // 4)  # bytes of lines to hold in RAM per run
+        for path in paths:
+            with open(path, 'r') as f:
+                while True:
+                    line = f.readline()
+                    if not line:
+                        break
+                    if not line.endswith('\n'):
+                        line += '\n'
+                    buf.append(line)
+                    used += len(line) + 32  # + object overhead
+                    if used > budget:
+                        buf.sort(key=key, reverse=rev)
+                        spill(buf, f"/.sort{len(runs)}.tmp")
+                        buf = []
+                        used = 0
+                        gc.collect()
+        buf.sort(key=key, reverse=rev)
+        if not runs:
+            _emit(buf, key, lambda l: print(l, end=''), uniq)
+            return
+        spill(buf, f"/.sort{len(runs)}.tmp")
+        buf = None
+        gc.collect()
+        n = len(runs)
+        while len(runs) > 8:  # keep the number of open files down: merge 8 runs at a time into a bigger run
+            path = f"/.sort{n}.tmp"
+            with open(path, 'w') as f:
+                _merge(runs[:8], key, lt, f.write, uniq)
+            runs = [path] + runs[8:]  # still in input order, so equal keys keep their order
+            n += 1
+        _merge(runs, key, lt, lambda l: print(l, end=''), uniq)
+    except Exception as e:
+        shell._ee(cmdenv, e)  # print(f"sort: {e}")
+        for path in runs:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _emit(lines, key, out, uniq):
+    last = None
+    for line in lines:
+        if uniq:
+            k = key(line)
+            if k == last:
+                continue
+            last = k
+        out(line)
+
+
+def _wcount(f, buf):
+    # one pass over the file through a single reused buffer; the in-a-word state carries across chunks,
+    # so a word split by a chunk boundary is only counted once
+    lines = words = nbytes = 0
+    inw = False
+    mv = memoryview(buf)
+    while True:
+        n = f.readinto(buf)
+        if not n:
+            break
+        nbytes += n
+        blk = bytes(mv[:n])  # micropython's bytearray has no split/count, and bytes.split is faster anyway
+        lines += blk.count(b'\n')
+        w = len(blk.split())
+        if inw and blk[0] not in b' \t\n\r\x0b\x0c':
+            w -= 1
+        words += w
+        inw = blk[n - 1] not in b' \t\n\r\x0b\x0c'
+    return lines, words, nbytes
+
+
+def wc(shell, cmdenv):  # impliments -l -w -c
+    sw = cmdenv['sw']
+    cols = [i for i, k in enumerate('lwc') if sw.get(k)] or [0, 1, 2]
+    paths = cmdenv['args'][1:]
+    if not paths:
+        if not shell._stdin(cmdenv):
+            shell._ea(cmdenv)  # print("wc: missing file operand")
+            return
+        paths = [None]
+    buf = bytearray(1024)  # two flash sectors
+    tot = [0, 0, 0]
+    for path in paths:
+        try:
+            with open(path or shell._stdin(cmdenv), 'rb') as f:
+                r = _wcount(f, buf)
+        except OSError as e:
+            shell._ee(cmdenv, e)  # print(f"wc: {e}")
+            continue
+        for i in range(3):
+            tot[i] += r[i]
+        print(' '.join(str(r[i]) for i in cols) + (f" {path}" if path else ''))
+    if len(paths) > 1:
+        print(' '.join(str(tot[i]) for i in cols) + " total")
+
+
+def _jprint(job):  # print, for a job: keeps the last 2K of its output until fg shows it
+    def p(*args, **kwargs):
+        job[3] = (job[3] + kwargs.get('sep', ' ').join(map(str, args)) + kwargs.get('end', '\n'))[-2048:]
+    return p
+
+
+def _job(shell, line):
+    # cmd &: a command that yields runs on as a job, stepped with the other background tasks; anything else just runs now, output kept
+    import builtins
+    job = [shell.jobs[-1][0] + 1 if shell.jobs else 1, line, None, '', 'Running', None]
+    op = builtins.print
+    builtins.print = _jprint(job)
+    shell._spawn = True
+    try:
+        shell.execute_command(line)
+    finally:
+        builtins.print = op
+    g, shell._spawn = shell._spawn, False
+    shell.jobs.append(job)
+    if hasattr(g, 'send'):
+        job[2] = g
+        job[5] = _jstep(job)
+        shell.io._tasks.append(job[5])
+        print(f"[{job[0]}] {line}")
+    else:
+        job[4] = 'Done'
+    return 1
+
+
+def _jstep(job):  # background task: a job, one step at a time, printing into its buffer
+    import builtins
+    jp = _jprint(job)
+    while True:
+        op = builtins.print
+        builtins.print = jp
+        try:
+            next(job[2])
+        except StopIteration:
+            job[4] = 'Done'
+        except Exception as e:
+            job[4] = f"Exit ({e})"
+        finally:
+            builtins.print = op
+        if job[4] != 'Running':
+            job[2] = job[5] = None
+            return
+        yield
+
+
+def _jnote(shell):  # at the prompt: say which jobs finished, like bash; those with output wait for fg
+    for j in shell.jobs[:]:
+        if j[4] != 'Running' and j[5] is None:
+            print(shell.get_desc('24').format(j[0], j[4], j[1]) + ('\t' + shell.get_desc('25').format(j[0]) if j[3] else ''))
+            j[5] = False
+            if not j[3]:
+                shell.jobs.remove(j)
+
+
+def _jget(shell, cmdenv):  # the job named by the argument (n or %n), else the newest
+    a = cmdenv['args'][1:]
+    for j in reversed(shell.jobs):
+        if not a or str(j[0]) == a[0].lstrip('%'):
+            return j
+    shell._ee(cmdenv, 'no such job')
+
+
+def jobs(shell, cmdenv):  # list the background jobs; finished ones with nothing to show are dropped once listed
+    for j in shell.jobs[:]:
+        print(f"[{j[0]}]  {j[4]:<12}{j[1]}")
+        if j[4] != 'Running' and not j[3]:
+            shell.jobs.remove(j)
+
+
+def fg(shell, cmdenv):  # fg [%n]: show what a job printed so far, then carry on running it here (^C stops it)
+    j = _jget(shell, cmdenv)
+    if not j:
+        return
+    shell.jobs.remove(j)
+    print(j[1])
+    print(j[3], end='')
+    if j[2]:
+        shell.io._tasks.remove(j[5])
+        return shell._fg(j[2])
+
+
+def kill(shell, cmdenv):  # kill [%n]: stop a job
+    j = _jget(shell, cmdenv)
+    if not j:
+        return
+    shell.jobs.remove(j)
+    if j[2]:
+        import builtins
+        shell.io._tasks.remove(j[5])
+        op = builtins.print
+        builtins.print = _jprint(j)  # what it says on the way out goes with it
+        try:
+            j[2].close()
+        finally:
+            builtins.print = op
+    print(f"[{j[0]}] Killed\t{j[1]}")
@@ -0,0 +1,291 @@
+# sh5.py
+
+__version__ = '1.0.20240626'  # Major.Minor.Patch
+
+# Created by Chris Drake.
+# Linux-like shell interface for CircuitPython.  https://github.com/gitcnd/cpy_shell
+#
+# This is a separate module for holding some commands.
+# it is separate to save RAM
+
+import os
+import time
+from array import array
+
+
+class _Lines:
+    # a file as an array of line hashes plus the offset of every 32nd line; the text itself stays on flash
+    def __init__(self, path):
+        from binascii import crc32
+        self.path = path
+        self.h = array('L')
+        self.offs = array('L')
+        self.eol = True
+        pos = 0
+        with open(path, 'rb') as f:
+            while True:
+                l = f.readline()
+                if not l:
+                    break
+                if not len(self.h) & 31:
+                    self.offs.append(pos)
+                self.h.append(crc32(l) & 0x3fffffff)  # keep it a small int, no heap allocation per compare
+                pos += len(l)
+                self.eol = l.endswith(b'\n')
+        self.f = None
+        self.n = 0  # line the file is positioned at
+
+    def get(self, i):  # reads forward from where we are, or seeks to the nearest indexed line first
+        if self.f is None:
+            self.f = open(self.path, 'rb')
+            self.n = len(self.h) + 32
+        if i < self.n or i - self.n > 31:
+            self.f.seek(self.offs[i >> 5])
+            self.n = i & ~31
+        while self.n < i:
+            self.f.readline()
+            self.n += 1
+        self.n += 1
+        return self.f.readline()
+
+
+def _bisect(a, b, a0, a1, b0, b1, dmax):
+    # middle of a linear-space Myers diff (the diff-match-patch variant): walk forward and backward
+    # D-paths until they overlap and return the split point, or None when more than dmax edits deep
+    n = a1 - a0
+    m = b1 - b0
+    maxd = min((n + m + 1) // 2, dmax)
+    vo = maxd
+    vl = 2 * maxd + 2
+    v1 = array('l', [-1] * vl)
+    v2 = array('l', [-1] * vl)
+    v1[vo + 1] = 0
+    v2[vo + 1] = 0
+    delta = n - m
+    front = delta & 1
+    k1s = k1e = k2s = k2e = 0
+    for d in range(maxd):
+        for k1 in range(-d + k1s, d + 1 - k1e, 2):
+            ko = vo + k1
+            x1 = v1[ko + 1] if k1 == -d or (k1 != d and v1[ko - 1] < v1[ko + 1]) else v1[ko - 1] + 1
+            y1 = x1 - k1
+            while x1 < n and y1 < m and a[a0 + x1] == b[b0 + y1]:
+                x1 += 1
+                y1 += 1
+            v1[ko] = x1
+            if x1 > n:
+                k1e += 2
+            elif y1 > m:
+                k1s += 2
+            elif front:
+                ko = vo + delta - k1
+                if 0 <= ko < vl and v2[ko] != -1 and x1 >= n - v2[ko]:
+                    return a0 + x1, b0 + y1
+        for k2 in range(-d + k2s, d + 1 - k2e, 2):
+            ko = vo + k2
+            x2 = v2[ko + 1] if k2 == -d or (k2 != d and v2[ko - 1] < v2[ko + 1]) else v2[ko - 1] + 1
+            y2 = x2 - k2
+            while x2 < n and y2 < m and a[a1 - x2 - 1] == b[b1 - y2 - 1]:
+                x2 += 1
+                y2 += 1
+            v2[ko] = x2
+            if x2 > n:
+                k2e += 2
+            elif y2 > m:
+                k2s += 2
+            elif not front:
+                ko = vo + delta - k2
+                if 0 <= ko < vl and v1[ko] != -1:
+                    x1 = v1[ko]
+                    if x1 >= n - x2:
+                        return a0 + x1, b0 + x1 - (ko - vo)
+    return None
+
+
+def _changes(a, b, dmax=1000):
+    # the edit script as (a0, a1, b0, b1) blocks in file order: a[a0:a1] is replaced by b[b0:b1]
+    out = []
+    todo = [(0, len(a), 0, len(b))]
+    while todo:
+        a0, a1, b0, b1 = todo.pop()
+        while a0 < a1 and b0 < b1 and a[a0] == b[b0]:
+            a0 += 1
+            b0 += 1
+        while a0 < a1 and b0 < b1 and a[a1 - 1] == b[b1 - 1]:
+            a1 -= 1
+            b1 -= 1
+        if a0 == a1 or b0 == b1:
+            sp = None
+        else:
+            sp = _bisect(a, b, a0, a1, b0, b1, dmax)
+        if sp:
+            todo.append((sp[0], a1, sp[1], b1))  # stack: the left half comes off first
+            todo.append((a0, sp[0], b0, sp[1]))
+        elif a0 < a1 or b0 < b1:
+            if out and out[-1][1] == a0 and out[-1][3] == b0:
+                c = out.pop()
+                a0, b0 = c[0], c[2]
+            out.append((a0, a1, b0, b1))
+    return out
+
+
+def _stamp(path):
+    return _when(time.localtime(os.stat(path)[8]))
+
+
+def _when(t):
+    return f"{t.tm_year}-{t.tm_mon:02}-{t.tm_mday:02} {t.tm_hour:02}:{t.tm_min:02}:{t.tm_sec:02}"
+
+
+def _out(tag, fl, i):
+    l = fl.get(i)
+    print(tag + l.decode('utf-8').rstrip('\n'))
+    if i == len(fl.h) - 1 and not fl.eol:
+        print("\\ No newline at end of file")
+
+
+def diff(shell, cmdenv):  # impliments -u (always on) -q -U n
+    try:
+        ctx = int(shell._swv(cmdenv, 'U', 3))
+    except ValueError as e:
+        shell._ee(cmdenv, e)  # print(f"diff: {e}")
+        return
+    if len(cmdenv['args']) < 3:
+        shell._ea(cmdenv)  # print("diff: missing operand")
+        return
+    pa, pb = cmdenv['args'][1], cmdenv['args'][2]
+    la = lb = None
+    try:
+        la = _Lines(pa)
+        lb = _Lines(pb)
+        if la.h == lb.h and la.eol == lb.eol:
+            return
+        if cmdenv['sw'].get('q'):
+            print(f"Files {pa} and {pb} differ")
+            return
+        ch = _changes(la.h, lb.h)
+        print(f"--- {pa}\t{_stamp(pa)}")
+        print(f"+++ {pb}\t{_stamp(pb)}")
+        i = 0
+        while i < len(ch):
+            j = i  # gather the changes that are close enough to share a hunk
+            while j + 1 < len(ch) and ch[j + 1][0] - ch[j][1] <= 2 * ctx:
+                j += 1
+            s = max(0, ch[i][0] - ctx)
+            e = min(len(la.h), ch[j][1] + ctx)
+            d = ch[i][2] - ch[i][0]  # line offset of b against a before this hunk
+            sb = s + d
+            eb = e + (ch[j][3] - ch[j][1])
+            print(f"@@ -{s + 1 if e > s else s},{e - s} +{sb + 1 if eb > sb else sb},{eb - sb} @@")
+            x = s
+            for c in ch[i:j + 1]:
+                for k in range(x, c[0]):
+                    _out(' ', la, k)
+                for k in range(c[0], c[1]):
+                    _out('-', la, k)
+                for k in range(c[2], c[3]):
+                    _out('+', lb, k)
+                x = c[1]
+            for k in range(x, e):
+                _out(' ', la, k)
+            i = j + 1
+    except OSError as e:
+        shell._ee(cmdenv, e)  # print(f"diff: {e}")
+    finally:
+        for fl in (la, lb):
+            if fl and fl.f:
+                fl.f.close()
+
+
+def _shown(l):
+    # the line as the terminal shows it, so characters are columns: tabs expanded to 8-column stops,
+    # ESC [ ... sequences (colours) and other control characters dropped, as watch does without -c
+    o = ''
+    i = 0
+    while i < len(l):
+        c = l[i]
+        if c == '\t':
+            o += ' ' * (8 - len(o) % 8)
+        elif c == '\033' and l[i + 1:i + 2] == '[':
+            i += 2
+            while i < len(l) and not '@' <= l[i] <= '~':
+                i += 1
+        elif c >= ' ':
+            o += c
+        i += 1
+    return o
+
+
+def _frame(old, new):
+    # escape codes that turn the screen showing old into new: only the part of each line that differs is sent
+    out = []
+    for r in range(max(len(old), len(new))):
+        a = old[r] if r < len(old) else ''
+        b = new[r] if r < len(new) else ''
+        if a == b:
+            continue
+        i, n = 0, min(len(a), len(b))
+        while i < n and a[i] == b[i]:
+            i += 1
+        if len(a) == len(b):  # same length: just the changed span
+            j = n
+            while b[j - 1] == a[j - 1]:
+                j -= 1
+            out.append(f"\033[{r + 1};{i + 1}H{b[i:j]}")
+        else:
+            out.append(f"\033[{r + 1};{i + 1}H{b[i:]}" + ("\033[K" if len(b) < len(a) else ''))
+    return ''.join(out)
+
+
+def watch(shell, cmdenv):  # watch [-n secs] [-t] command: yields between runs, so ^C (or kill, if run with &) stops it
+    import builtins
+    w = cmdenv['line'].split()[1:]  # the command's own switches are in here too, where watch's parse put them
+    secs, title = 2.0, True
+    try:
+        while w and w[0][0] == '-':
+            o = w.pop(0)
+            if o == '-t':
+                title = False
+            elif o[:2] == '-n' and (o[2:] or w):
+                secs = float(o[2:] or w.pop(0))
+            else:
+                w.insert(0, o)
+                break
+    except ValueError as e:
+        shell._ee(cmdenv, e)  # print(f"watch: {e}")
+        return
+    if not w:
+        shell._ea(cmdenv)  # print("watch: missing operand")
+        return
+    cmd = ' '.join(w)
+    io = shell.io
+    rows = (io._TERM_HEIGHT if io else 24) - 1
+    cols = io._TERM_WIDTH if io else 80
+    old = None
+    try:
+        while True:
+            buf = []
+            op = builtins.print
+            builtins.print = lambda *a, **k: buf.append(k.get('sep', ' ').join(map(str, a)) + k.get('end', '\n'))
+            try:
+                shell.execute_command(cmd)
+            finally:
+                builtins.print = op
+            new = ''.join(buf).replace('\r', '').split('\n')
+            if title:
+                ts = _when(time.localtime())
+                h = f"Every {secs}s: {cmd}"[:cols - len(ts) - 1]
+                new = [h + ' ' * (cols - len(h) - len(ts)) + ts, ''] + new
+            new = [_shown(l)[:cols] for l in new[:rows]]
+            if old is None:
+                print("\033[2J", end='')
+                old = []
+            d = _frame(old, new)
+            if d:
+                print(d + f"\033[{rows + 1};1H", end='')  # park the cursor below the frame
+            old = new
+            t = time.monotonic() + secs
+            while time.monotonic() < t:
+                yield
+    finally:
+        print(f"\033[{rows + 1};1H\033[K", end='')
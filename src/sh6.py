@@ -0,0 +1,169 @@
+# sh6.py
+
+__version__ = '1.0.20240626'  # Major.Minor.Patch
+
+# Created by Chris Drake.
+# Linux-like shell interface for CircuitPython.  https://github.com/gitcnd/cpy_shell
+#
+# This is a separate module for holding some commands.
+# it is separate to save RAM
+
+import os
+import struct
+from binascii import crc32
+
+_WB = 10  # deflate window bits for files we compress: a 1K window, so reading them back needs only 1K too
+
+
+class _GzOut:
+    # gzip writer: our own header (to record the window size in an FEXTRA 'cw' subfield), raw deflate body, crc32/size trailer
+    def __init__(self, f, name='', mtime=0):
+        import deflate
+        f.write(b'\x1f\x8b\x08' + bytes([0x0c if name else 0x04]) + struct.pack('<I', mtime) + b'\x00\xff\x05\x00cw\x01\x00' + bytes([_WB]))
+        if name:
+            f.write(name.encode('utf-8') + b'\x00')
+        self.f = f
+        self.z = deflate.DeflateIO(f, deflate.RAW, _WB)
+        self.crc = 0
+        self.n = 0
+
+    def write(self, b):
+        self.crc = crc32(b, self.crc)
+        self.n += len(b)
+        return self.z.write(b)
+
+    def close(self):
+        self.z.close()
+        self.f.write(struct.pack('<II', self.crc & 0xffffffff, self.n & 0xffffffff))
+
+
+def _zin(f):
+    # decompressing reader over a gzip file; uses the window recorded by _GzOut, else the full 32K any other gzip may need
+    import deflate
+    h = f.read(10)
+    if h[:2] != b'\x1f\x8b':
+        raise ValueError('not in gzip format')
+    wb = 15
+    if h[3] & 4:
+        x = f.read(2)
+        x = f.read(x[0] | x[1] << 8)
+        i = 0
+        while i + 4 <= len(x):
+            ln = x[i + 2] | x[i + 3] << 8
+            if x[i:i + 2] == b'cw' and ln:
+                wb = x[i + 4]
+            i += 4 + ln
+    f.seek(0)
+    return deflate.DeflateIO(f, deflate.GZIP, wb)
+
+
+def _pump(src, dst, buf):  # copy stream to stream through one reused buffer
+    mv = memoryview(buf)
+    while True:
+        n = src.readinto(buf)
+        if not n:
+            break
+        dst.write(mv[:n])
+
+
+def gzip(shell, cmdenv):  # impliments -k -d
+    if cmdenv['args'][0] == 'gunzip' or cmdenv['sw'].get('d'):
+        return gunzip(shell, cmdenv)
+    if len(cmdenv['args']) < 2:
+        shell._ea(cmdenv)  # print("gzip: missing file operand")
+        return
+    buf = bytearray(512)
+    for path in cmdenv['args'][1:]:
+        try:
+            with open(path, 'rb') as src, open(path + '.gz', 'wb') as dst:
+                z = _GzOut(dst, path.split('/')[-1], os.stat(path)[8])
+                _pump(src, z, buf)
+                z.close()
+            if not cmdenv['sw'].get('k'):
+                os.remove(path)
+        except Exception as e:
+            shell._ee(cmdenv, e)  # print(f"gzip: {e}")
+
+
+def gunzip(shell, cmdenv):  # impliments -k
+    if len(cmdenv['args']) < 2:
+        shell._ea(cmdenv)  # print("gunzip: missing file operand")
+        return
+    buf = bytearray(512)
+    for path in cmdenv['args'][1:]:
+        if not path.endswith('.gz'):
+            print(shell.get_desc('21').format(cmdenv['args'][0], path))  # gunzip: x: unknown suffix -- ignored
+            continue
+        try:
+            with open(path, 'rb') as src, open(path[:-3], 'wb') as dst:
+                _pump(_zin(src), dst, buf)
+            if not cmdenv['sw'].get('k'):
+                os.remove(path)
+        except Exception as e:
+            shell._ee(cmdenv, e)  # print(f"gunzip: {e}")
+
+
+def zcat(shell, cmdenv):
+    paths = cmdenv['args'][1:] or [shell._stdin(cmdenv)]
+    if paths == [None]:
+        shell._ea(cmdenv)  # print("zcat: missing file operand")
+        return
+    buf = bytearray(512)
+    mv = memoryview(buf)
+    for path in paths:
+        out = shell._u8()  # a character can straddle two blocks
+        try:
+            with open(path, 'rb') as f:
+                z = _zin(f)
+                while True:
+                    n = z.readinto(buf)
+                    if not n:
+                        break
+                    out(mv[:n])
+        except Exception as e:
+            shell._ee(cmdenv, e)  # print(f"zcat: {e}")
+
+
+def _walk(path):
+    if os.stat(path)[0] & 0x4000:
+        for f in sorted(os.listdir(path)):
+            yield from _walk(f"{path.rstrip('/')}/{f}")
+    else:
+        yield path
+
+
+def grep(shell, cmdenv):  # impliments -i -v -n -c -r ; fixed strings, .gz files are searched through zcat
+    sw = cmdenv['sw']
+    if len(cmdenv['args']) < 2:
+        shell._ea(cmdenv)  # print("grep: missing operand")
+        return
+    pat = cmdenv['args'][1].encode('utf-8')
+    if sw.get('i'):
+        pat = pat.lower()
+    paths = cmdenv['args'][2:] or [shell._stdin(cmdenv)]
+    if paths == [None]:
+        shell._ea(cmdenv)
+        return
+    many = len(paths) > 1 or sw.get('r')
+    for top in paths:
+        try:
+            for path in _walk(top) if sw.get('r') else [top]:
+                with open(path, 'rb') as f:
+                    z = _zin(f) if path.endswith('.gz') else f
+                    no = hits = 0
+                    pre = path + ':' if many else ''
+                    while True:
+                        l = z.readline()
+                        if not l:
+                            break
+                        no += 1
+                        if ((pat in l.lower()) if sw.get('i') else (pat in l)) == bool(sw.get('v')):
+                            continue
+                        hits += 1
+                        if not sw.get('c'):
+                            l = l.decode('utf-8').rstrip('\n')
+                            print(f"{pre}{no}:{l}" if sw.get('n') else f"{pre}{l}")
+                    if sw.get('c'):
+                        print(f"{pre}{hits}")
+        except Exception as e:
+            shell._ee(cmdenv, e)  # print(f"grep: {e}")
@@ -0,0 +1,213 @@
+# sh7.py
+
+__version__ = '1.0.20240626'  # Major.Minor.Patch
+
+# Created by Chris Drake.
+# Linux-like shell interface for CircuitPython.  https://github.com/gitcnd/cpy_shell
+#
+# This is a separate module for holding some commands.
+# it is separate to save RAM
+
+import os
+import time
+
+
+def _oct(blk, off, ln, v):  # ustar number: zero-padded octal, NUL terminated
+    blk[off:off + ln - 1] = ('0' * ln + '{:o}'.format(v))[1 - ln:].encode()
+
+
+def _zero(blk):
+    for i in range(512):
+        blk[i] = 0
+
+
+def _hdr(out, blk, name, size, mtime, typ):
+    # write a ustar header built in blk; names that do not fit name+prefix go first as a GNU 'L' long name entry
+    nb = name.encode('utf-8')
+    i = nb.rfind(b'/', 0, 156) if len(nb) > 100 else 0
+    if len(nb) > 100 and (i < 1 or len(nb) - i - 1 > 100):
+        _hdr(out, blk, '././@LongLink', len(nb) + 1, 0, b'L')
+        for j in range(0, len(nb) + 1, 512):
+            _zero(blk)
+            part = nb[j:j + 512]
+            blk[0:len(part)] = part
+            out.write(blk)
+        nb, i = nb[:100], 0
+    _zero(blk)
+    if i > 0:  # long names are split over the prefix and name fields at a '/'
+        blk[345:345 + i] = nb[:i]
+        nb = nb[i + 1:]
+    blk[0:len(nb)] = nb
+    _oct(blk, 100, 8, 0o755 if typ == b'5' else 0o644)
+    _oct(blk, 108, 8, 0)
+    _oct(blk, 116, 8, 0)
+    _oct(blk, 124, 12, size)
+    _oct(blk, 136, 12, mtime)
+    blk[156:157] = typ
+    blk[257:265] = b'ustar\x0000'
+    blk[148:156] = b'        '
+    blk[148:156] = ('{:06o}'.format(sum(blk))).encode() + b'\x00 '
+    out.write(blk)
+
+
+def _str(b):
+    i = b.find(b'\x00')
+    return (b if i < 0 else b[:i]).decode('utf-8')
+
+
+def _fill(f, blk, mv):  # read a whole block; stream readers may hand back less than asked for
+    n = 0
+    while n < 512:
+        r = f.readinto(mv[n:])
+        if not r:
+            break
+        n += r
+    return n
+
+
+def _walk(path):
+    st = os.stat(path)
+    if st[0] & 0x4000:
+        yield path.rstrip('/') + '/', st
+        for f in sorted(os.listdir(path)):
+            yield from _walk(f"{path.rstrip('/')}/{f}")
+    else:
+        yield path, st
+
+
+def _mkdirs(path):
+    p = ''
+    for part in path.split('/')[:-1]:
+        p += part + '/'
+        try:
+            os.mkdir(p.rstrip('/'))
+        except OSError:
+            pass
+
+
+def _abs(p):  # absolute, with . and .. resolved, so two spellings of a path compare equal
+    if p[:1] != '/':
+        p = os.getcwd().rstrip('/') + '/' + p
+    o = []
+    for c in p.split('/'):
+        if c == '..':
+            if o:
+                o.pop()
+        elif c and c != '.':
+            o.append(c)
+    return '/' + '/'.join(o)
+
+
+def _create(cmdenv, out, paths, blk, mv, skip):
+    verbose = cmdenv['sw'].get('v')
+    for top in paths:
+        for path, st in _walk(top):
+            if _abs(path) == skip:  # the archive being written (tar cf z.tar .)
+                continue
+            name = path.lstrip('/')
+            if verbose:
+                print(name)
+            if path.endswith('/'):
+                _hdr(out, blk, name, 0, st[8], b'5')
+                continue
+            _hdr(out, blk, name, st[6], st[8], b'0')
+            left = st[6]
+            with open(path, 'rb') as f:
+                while left > 0:  # exactly the size in the header: a file that grows meanwhile is cut, one that shrinks is padded with zeros
+                    n = min(_fill(f, blk, mv), left)
+                    for i in range(n, 512):
+                        blk[i] = 0
+                    out.write(blk)
+                    left -= 512
+    _zero(blk)
+    out.write(blk)
+    out.write(blk)
+
+
+def _extract(cmdenv, inp, blk, mv, listing):
+    verbose = cmdenv['sw'].get('v')
+    longname = None
+    while _fill(inp, blk, mv) == 512 and blk[0]:
+        chk = int(_str(blk[148:156]).strip() or '0', 8)
+        blk[148:156] = b'        '
+        if sum(blk) != chk:
+            raise ValueError('checksum error')
+        name = _str(blk[0:100])
+        if blk[257:262] == b'ustar' and blk[345]:
+            name = _str(blk[345:500]) + '/' + name
+        if longname:
+            name, longname = longname, None
+        size = int(_str(blk[124:136]).strip() or '0', 8)
+        typ = blk[156]
+        if typ == 76:  # 'L': GNU long name, the data is the next entry's name
+            longname = ''
+            while size > 0:
+                _fill(inp, blk, mv)
+                longname += _str(blk[:min(size, 512)])
+                size -= 512
+            continue
+        name = name.lstrip('/')  # always relative to where we are, so /code.py or /boot_out.txt in an archive can not be overwritten
+        bad = not name or '..' in name.split('/')
+        if bad and not listing:
+            print(f"{cmdenv['args'][0]}: {name}: skipped, unsafe path")
+        elif listing:
+            if verbose:
+                t = time.localtime(int(_str(blk[136:148]).strip() or '0', 8))
+                print(f"{size:10} {t.tm_year}-{t.tm_mon:02}-{t.tm_mday:02} {t.tm_hour:02}:{t.tm_min:02} {name}")
+            else:
+                print(name)
+        elif verbose:
+            print(name)
+        out = None
+        if not (listing or bad):
+            if typ == 53:  # '5' directory
+                _mkdirs(name.rstrip('/') + '/')
+            elif typ in (48, 0):  # '0' regular file
+                _mkdirs(name)
+                out = open(name, 'wb')
+        try:
+            while size > 0:
+                n = _fill(inp, blk, mv)
+                if out:
+                    out.write(mv[:min(n, size)])
+                size -= 512
+        finally:
+            if out:
+                out.close()
+
+
+def tar(shell, cmdenv):  # impliments c x t v z f (as tar czf a.tgz dir or tar -xvf a.tar)
+    sw = cmdenv['sw']
+    args = cmdenv['args']
+    if len(args) > 1 and not args[1].startswith('-') and args[1].isalpha() and 'f' in args[1] and not shell.file_exists(args[1]):
+        for c in args.pop(1):  # old style bundled flags without a dash
+            sw[c] = True
+        if len(args) > 1:
+            sw['f'] = args.pop(1)
+    archive = shell._swv(cmdenv, 'f')
+    if not isinstance(archive, str) or not (sw.get('c') or sw.get('x') or sw.get('t')):
+        shell._ea(cmdenv)  # print("tar: missing operand")
+        return
+    blk = bytearray(512)
+    mv = memoryview(blk)
+    try:
+        if sw.get('c'):
+            with open(archive, 'wb') as f:
+                out = f
+                if sw.get('z'):
+                    out = shell._mod('sh6', False)._GzOut(f, archive.split('/')[-1].rsplit('.', 1)[0])
+                try:
+                    _create(cmdenv, out, args[1:], blk, mv, _abs(archive))
+                finally:
+                    if out is not f:
+                        out.close()
+        else:
+            with open(archive, 'rb') as f:
+                inp = f
+                magic = f.read(2)
+                f.seek(0)
+                if magic == b'\x1f\x8b':  # gzipped, whether or not -z was given
+                    inp = shell._mod('sh6', False)._zin(f)
+                _extract(cmdenv, inp, blk, mv, sw.get('t'))
+    except Exception as e:
+        shell._ee(cmdenv, e)  # print(f"tar: {e}")
@@ -0,0 +1,291 @@
+# sh8.py
+
+__version__ = '1.0.20240626'  # Major.Minor.Patch
+
+# Created by Chris Drake.
+# Linux-like shell interface for CircuitPython.  https://github.com/gitcnd/cpy_shell
+#
+# This is a separate module for holding some commands.
+# it is separate to save RAM
+
+import os
+import time
+import shnet
+
+
+def _parse_url(url):
+    if "://" not in url:
+        url = "http://" + url
+    protocol, _, host_path = url.partition("://")
+    if "/" in host_path:
+        host, path = host_path.split("/", 1)
+        path = "/" + path
+    else:
+        host = host_path
+        path = "/"
+
+    if ":" in host:
+        host, port = host.split(":")
+        port = int(port)
+    else:
+        port = 80 if protocol == "http" else 443
+
+    return protocol, host, port, path
+
+
+class _Http:
+    # bytes HTTP/1.1 response reader: everything goes through one receive buffer, unread data is buf[a:b].
+    # line() and body() are generators: on a non-blocking socket they yield while there is nothing to read
+    def __init__(self, sock, size, timeout=10):
+        self.s = sock
+        self.buf = bytearray(size)
+        self.mv = memoryview(self.buf)
+        self.a = self.b = 0
+        self.to = timeout
+
+    def _more(self):  # move what is left to the front and receive after it; returns the bytes received
+        if self.a:
+            self.mv[0:self.b - self.a] = self.mv[self.a:self.b]
+            self.a, self.b = 0, self.b - self.a
+        if self.b == len(self.buf):
+            raise ValueError('header line too long')
+        t = None
+        while True:
+            try:
+                n = self.s.recv_into(self.mv[self.b:])
+                break
+            except OSError as e:
+                if e.errno != 11:  # EAGAIN: nothing yet
+                    raise
+                t = t or time.monotonic()
+                if time.monotonic() - t > self.to:
+                    raise OSError('timed out')
+                yield
+        self.b += n
+        return n
+
+    def line(self):  # a status, header or chunk size line without its CRLF, None at EOF
+        while True:
+            i = self.a
+            while i < self.b and self.buf[i] != 10:
+                i += 1
+            if i < self.b:
+                l = bytes(self.mv[self.a:i]).rstrip(b'\r')
+                self.a = i + 1
+                return l
+            if not (yield from self._more()):
+                return None
+
+    def body(self, n, out):  # hand n bytes (all of them up to EOF if n < 0) to out() as memoryviews of the buffer
+        while n:
+            if self.a == self.b:
+                self.a = self.b = 0
+                if not (yield from self._more()):
+                    if n > 0:
+                        raise ValueError('connection closed early')
+                    return
+            k = self.b - self.a if n < 0 else min(n, self.b - self.a)
+            out(self.mv[self.a:self.a + k])
+            self.a += k
+            if n > 0:
+                n -= k
+
+
+def _get(shell, sw, url, outfile, nb):
+    # one request as a generator; with nb (non-blocking) it yields whenever it would have to wait
+    method = "GET"
+    headers = {"Host": ""}
+    data = sw.get('data')
+    show = sw.get('i', False)
+
+    if sw.get('I'):
+        method = "HEAD"
+        show = True
+    if data:
+        method = "POST"
+        headers["Content-Type"] = "application/x-www-form-urlencoded"
+        headers["Content-Length"] = str(len(data))
+
+    protocol, host, port, path = _parse_url(url)
+    headers["Host"] = host
+    if outfile is True:  # -O: named as the remote file
+        outfile = path.split('?')[0].rstrip('/').split('/')[-1] or 'index.html'
+    have = 0
+    if outfile and sw.get('c'):  # resume: ask only for what the partial file is missing
+        try:
+            have = os.stat(outfile)[6]
+        except OSError:
+            pass
+        if have:
+            headers["Range"] = f"bytes={have}-"
+
+    sock = f = None
+    keep = False
+    try:
+        request = (f"{method} {path} HTTP/1.1\r\n" + ''.join(f"{k}: {v}\r\n" for k, v in headers.items()) + "\r\n" + (data or '')).encode('utf-8')
+        for t in range(2):
+            sock, reused = shnet.connect(protocol, host, port, fresh=t, nb=nb)  # kept alive from an earlier request to this host when possible
+            try:
+                if nb:
+                    sock.settimeout(0)
+                    yield from _send(sock, request)
+                else:
+                    sock.send(request)
+                r = _Http(sock, max(256, int(sw.get('buf', 4096))))  # bigger buffers mean fewer, larger reads: faster, if there is RAM for it
+                status = yield from r.line()
+            except OSError:
+                if not reused:
+                    raise
+                status = None
+            if status or not reused:
+                break
+            sock.close()  # the server had dropped the idle connection; try again on a new one (fresh closes the other idle ones)
+            sock = None
+        if not status:
+            raise ValueError('empty reply from server')
+        ka = status.startswith(b'HTTP/1.1')  # keep-alive unless told otherwise
+        code = int(status.split()[1])
+        if have and code == 416:  # nothing past the end of what we have
+            print(f"{outfile}: already fully retrieved")
+            return True
+        if have and code not in (200, 206):
+            raise ValueError(status.decode('utf-8'))  # leave the partial file alone
+        if outfile:
+            f = open(outfile, 'ab' if have and code == 206 else 'wb')  # 206: append the rest, 200: the server sent it all again
+        out = f.write if f else shell._u8()
+        length = -1
+        chunked = False
+        l = status
+        while l:
+            if show:
+                out(l + b'\r\n')
+            l = yield from r.line()
+            k, _, v = (l or b'').partition(b':')
+            k = k.strip().lower()
+            if k == b'content-length':
+                length = int(v)
+            elif k == b'transfer-encoding' and b'chunked' in v.lower():
+                chunked = True
+            elif k == b'connection' and b'close' in v.lower():
+                ka = False
+            elif k == b'content-range' and code == 206 and int(v.split()[1].split(b'-')[0]) != have:
+                raise ValueError('server resumed at the wrong offset')
+        if show:
+            out(b'\r\n')
+        if method == "HEAD" or code in (204, 304) or 100 <= code < 200:
+            keep = ka
+            return True
+        if chunked:
+            while True:
+                n = int((yield from r.line()).split(b';')[0], 16)
+                if not n:
+                    break
+                yield from r.body(n, out)
+                yield from r.line()  # the CRLF after the chunk
+            while (yield from r.line()):  # trailers
+                pass
+        else:
+            yield from r.body(length, out)
+        keep = ka and (chunked or length >= 0)  # only once the response was read to its end; one that ends at EOF can not share its connection
+        return True
+
+    except Exception as e:
+        print(f"Error fetching {url}: {e}")
+    finally:
+        if f:
+            f.close()
+        if keep:
+            shnet.release(protocol, host, port, sock)
+        elif sock:
+            sock.close()
+
+
+def _send(s, data, to=10):  # send on a non-blocking socket, yielding while it is still connecting or full
+    mv = memoryview(data)
+    t = time.monotonic()
+    while mv:
+        try:
+            mv = mv[s.send(mv):]
+        except OSError as e:
+            if e.errno not in shnet.PENDING:
+                raise
+            if time.monotonic() - t > to:
+                raise OSError('timed out')
+            yield
+
+
+def _rm(p):  # a temp file that may never have been made
+    if p:
+        try:
+            os.remove(p)
+        except OSError:
+            pass
+
+
+def _wait(s):
+    t = time.monotonic() + s
+    while time.monotonic() < t:
+        yield
+
+
+def curl(shell, cmdenv):  # impliments -i -I --data= -o file --output=file -O -c --tries=n --buf=bytes ; several urls are fetched at once (-O, not -o)
+    # a generator: it yields whenever it waits on the network, so downloads can run as jobs (wget url &)
+    sw = cmdenv['sw']
+    outfile = shell._swv(cmdenv, 'o') or sw.get('output') or sw.get('O') or cmdenv['args'][0] == 'wget'
+    urls = cmdenv['args'][1:]
+    if not urls:
+        print("usage: curl [-I] [-i] [--data=data] [-o file] [-c] [--tries=n] [--buf=4096] <url> [url ...]")
+        return
+    if len(urls) > 1 and outfile and outfile is not True:
+        shell._ee(cmdenv, "-o names one file: use -O to save each url")
+        return
+    if len(urls) == 1:
+        tries = int(sw.get('tries', 1))
+        for t in range(tries):
+            if t:
+                yield from _wait(min(2 ** t, 30))  # back off: 2, 4, 8 ... seconds
+                print(f"Retrying ({t + 1}/{tries})")
+                if outfile:
+                    sw['c'] = True  # carry on from whatever made it to flash
+            if (yield from _get(shell, sw, urls[0], outfile, True)):
+                break
+        return
+    # each url is a job stepped round-robin over non-blocking sockets; without -O every body
+    # goes to a temp file on flash (like our pipes) and is shown under its url when it completes
+    jobs = []
+    for i, url in enumerate(urls):
+        try:
+            shnet.addr(_parse_url(url)[1])  # every lookup up front: a dead name fails here, not mid-transfer
+        except Exception as e:
+            print(f"Error fetching {url}: {e}")
+            continue
+        tmp = None if outfile is True else f"/.curl{i}.tmp"
+        jobs.append([url, tmp, _get(shell, sw, url, tmp or True, True)])
+    buf = bytearray(512)
+    mv = memoryview(buf)
+    try:
+        while jobs:
+            for j in jobs[:]:
+                try:
+                    next(j[2])
+                except StopIteration as e:
+                    jobs.remove(j)
+                    if j[1] and e.value:  # a failed one has already said why
+                        print(f"==> {j[0]} <==")
+                        p = shell._u8()
+                        with open(j[1], 'rb') as f:
+                            while True:
+                                n = f.readinto(buf)
+                                if not n:
+                                    break
+                                p(mv[:n])
+                    _rm(j[1])
+            yield
+    finally:
+        for j in jobs:  # interrupted: stop the rest and tidy up
+            j[2].close()
+            _rm(j[1])
+
+
+def wget(shell, cmdenv):  # like curl, but saves to a file named as the remote file unless -o is given
+    return curl(shell, cmdenv)
@@ -0,0 +1,188 @@
+# sh9.py
+
+__version__ = '1.0.20240626'  # Major.Minor.Patch
+
+# Created by Chris Drake.
+# Linux-like shell interface for CircuitPython.  https://github.com/gitcnd/cpy_shell
+#
+# This is a separate module for holding some commands.
+# it is separate to save RAM
+
+import struct
+import time
+import shnet
+
+
+def _ip(s):  # a dotted quad, not just a name that starts with a digit (1password.com)
+    p = s.split('.')
+    return len(p) == 4 and all(x.isdigit() and int(x) < 256 for x in p)
+
+
+def _hosts(spec):  # a host name, or every host address of a.b.c.d/nn
+    if '/' not in spec:
+        yield spec if _ip(spec) else shnet.addr(spec)
+        return
+    ip, bits = spec.split('/')
+    bits = int(bits)
+    n = 0
+    for b in ip.split('.'):
+        n = n << 8 | int(b)
+    size = 1 << (32 - bits)
+    n &= ~(size - 1)
+    lo, hi = (1, size - 1) if size > 2 else (0, size)  # skip the network and broadcast addresses
+    for i in range(lo, hi):
+        a = n + i
+        yield f"{a >> 24}.{a >> 16 & 255}.{a >> 8 & 255}.{a & 255}"
+
+
+def _sum(data):  # internet checksum
+    s = 0
+    for i in range(0, len(data), 2):
+        s += data[i] << 8 | data[i + 1]
+    s = (s >> 16) + (s & 0xffff)
+    s += s >> 16
+    return ~s & 0xffff
+
+
+def _sweep_raw(s, hosts, wait, par):
+    # many echo requests in flight at once on one raw ICMP socket; yields (ip, rtt ms or None), or None while there is nothing to read
+    try:
+        s.settimeout(0)
+        buf = bytearray(128)
+        out = {}  # ip: time sent
+        ident = int(time.monotonic() * 1000) & 0xffff
+        seq = 0
+        more = True
+        while more or out:
+            while more and len(out) < par:
+                try:
+                    ip = next(hosts)
+                except StopIteration:
+                    more = False
+                    break
+                if ip in out:  # already waiting on it
+                    continue
+                seq += 1
+                pkt = bytearray(struct.pack('!BBHHH8s', 8, 0, 0, ident, seq & 0xffff, b'cpyshell'))
+                pkt[2:4] = struct.pack('!H', _sum(pkt))
+                try:
+                    s.sendto(pkt, (ip, 0))
+                except OSError:  # ENOMEM, EHOSTUNREACH ...: that one is lost, the sweep goes on
+                    yield ip, None
+                    continue
+                out[ip] = time.monotonic()
+            try:
+                n, addr = s.recvfrom_into(buf)
+            except OSError:
+                n = 0
+            now = time.monotonic()
+            if n:
+                h = (buf[0] & 15) * 4 if buf[0] >> 4 == 4 else 0  # skip the IP header if we were given one
+                if n >= h + 8 and buf[h] == 0 and struct.unpack_from('!H', buf, h + 4)[0] == ident and addr[0] in out:
+                    yield addr[0], (now - out.pop(addr[0])) * 1000
+            for ip in [ip for ip, t in out.items() if now - t > wait]:
+                del out[ip]
+                yield ip, None
+            if not n:
+                yield  # nothing came back yet: let the shell (and the other jobs) run
+    finally:
+        s.close()
+
+
+def _sweep(hosts, wait):  # one host at a time, when there are no raw sockets; each ping blocks for up to wait
+    import ipaddress
+    import wifi
+    for ip in hosts:
+        r = wifi.radio.ping(ipaddress.ip_address(ip), timeout=wait)
+        yield ip, None if r is None else r * 1000
+        yield
+
+
+def ping(shell, cmdenv):  # a generator; impliments -c count -i interval -W timeout ; several hosts or a.b.c.d/nn sweep, --par=n at once
+    try:
+        count = int(shell._swv(cmdenv, 'c', 4))
+        interval = float(shell._swv(cmdenv, 'i', 1))
+        wait = float(shell._swv(cmdenv, 'W', 1))
+        par = int(cmdenv['sw'].get('par', 16))
+    except ValueError as e:
+        shell._ee(cmdenv, e)  # print(f"ping: {e}")
+        return
+    args = cmdenv['args'][1:]
+    if not args:
+        print(shell.get_desc('14'))  # usage: ping <address>
+        return
+    if len(args) > 1 or '/' in args[0]:
+        yield from _sweeps(shell, args, wait, par)  # yields too, so a sweep can run as a job (ping 10.0.0.0/24 &)
+        return
+
+    import ipaddress
+    import wifi
+    dom = args[0]
+    try:
+        ip = next(_hosts(dom))
+        ip1 = ipaddress.ip_address(ip)
+    except Exception as e:
+        print(shell.get_desc('15').format(e))  # Error getting IP address: {e}
+        return
+
+    print(shell.get_desc('16').format(dom, ip))  # PING {dom} ({ip}) 56(84) bytes of data.
+    transmitted = received = 0
+    lo = hi = tot = tot2 = 0.0  # running min/max/sum/sum of squares: the summary needs no list of times
+    start = time.monotonic()
+    try:
+        while transmitted < count:
+            transmitted += 1
+            result = wifi.radio.ping(ip1, timeout=wait)
+            if result is not None:
+                rtt = result * 1000
+                received += 1
+                lo = rtt if received == 1 else min(lo, rtt)
+                hi = max(hi, rtt)
+                tot += rtt
+                tot2 += rtt * rtt
+                print(f"64 bytes from {ip}: icmp_seq={transmitted} time={rtt:.1f} ms")
+            else:
+                print(shell.get_desc('17').format(transmitted))  # Request timeout for icmp_seq {seq}
+            if transmitted < count:
+                t = start + transmitted * interval  # each ping has its slot; a slow one does not push the rest back
+                while time.monotonic() < t:
+                    yield  # waiting for the next slot: a generator, so ping can run as a job
+    except (KeyboardInterrupt, GeneratorExit):  # ^C, fg then ^C, or kill
+        pass
+
+    elapsed = (time.monotonic() - start) * 1000
+    print(shell.get_desc('18').format(ip, transmitted, received, ((transmitted - received) / transmitted) * 100, elapsed))
+    if received:
+        avg = tot / received
+        print(shell.get_desc('19').format(lo, avg, hi, max(0, tot2 / received - avg * avg) ** 0.5))  # rtt min/avg/max/mdev
+
+
+def _sweeps(shell, args, wait, par):
+
+    def hosts():
+        for a in args:
+            try:
+                yield from _hosts(a)
+            except Exception as e:
+                print(shell.get_desc('15').format(e))  # Error getting IP address: {e}
+
+    p = shnet.pool()
+    try:
+        res = _sweep_raw(p.socket(p.AF_INET, p.SOCK_RAW, p.IPPROTO_ICMP), hosts(), wait, par)
+    except (AttributeError, OSError):  # no raw sockets on this port
+        res = _sweep(hosts(), wait)
+    n = up = 0
+    try:
+        for r in res:
+            if r is None:
+                yield
+                continue
+            n += 1
+            if r[1] is not None:
+                up += 1
+                print(f"{r[0]} is alive ({r[1]:.1f} ms)")
+    except (KeyboardInterrupt, GeneratorExit):  # ^C, fg then ^C, or kill
+        pass
+    finally:
+        res.close()
+    print(f"{up} of {n} hosts up")
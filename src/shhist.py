@@ -0,0 +1,243 @@
+# shhist.py
+
+__version__ = '1.0.20240626'  # Major.Minor.Patch
+
+# Created by Chris Drake.
+# Linux-like shell interface for CircuitPython.  https://github.com/gitcnd/cpy_shell
+#
+# ^R reverse incremental history search.  Loaded on the first ^R and then kept, like shnet, along with
+# its index of the history file: each line's offset plus a 60 bit signature of its hashed trigrams
+# (12 bytes a line).  A keystroke narrows the candidates in RAM; only the line shown is read back.
+# The history file's compaction lives here too, so it is only loaded when a cap is reached.
+
+import os
+import sys
+from array import array
+
+off = None    # offset of each line in the history file, oldest first
+lo = None     # signature bits 0-29 and 30-59 (two small ints, so no long int maths)
+hi = None
+_io = None    # the CustomIO searching
+_f = None     # the history file, open while a search is
+_st = None    # search in progress: [query, original line, original cursor, candidates newest first, match's line, match]
+
+
+def _sig(b):  # trigram signature of a command (bytes)
+    l = h = 0
+    for i in range(len(b) - 2):
+        k = (b[i] * 961 + b[i + 1] * 31 + b[i + 2]) % 60
+        if k < 30:
+            l |= 1 << k
+        else:
+            h |= 1 << (k - 30)
+    return l, h
+
+
+def _add(pos, line):
+    s = _sig(line.split(b'\t', 1)[-1].rstrip(b'\r\n'))
+    off.append(pos)
+    lo.append(s[0])
+    hi.append(s[1])
+
+
+def build(fn):  # index the whole history file
+    global off, lo, hi
+    off, lo, hi = array('I'), array('I'), array('I')
+    pos = 0
+    try:
+        with open(fn, 'rb') as f:
+            while True:
+                l = f.readline()
+                if not l:
+                    break
+                _add(pos, l)
+                pos += len(l)
+    except OSError:
+        pass
+
+
+def add(pos, data):  # lines (bytes) just appended to the file at pos
+    if off is None:
+        return
+    i = 0
+    while i < len(data):
+        j = data.find(b'\n', i) + 1 or len(data)
+        _add(pos + i, data[i:j])
+        i = j
+
+
+def cut(k, n):  # the file lost its first k lines, n bytes
+    global off, lo, hi, _f
+    if off is None:
+        return
+    off = array('I', [o - n for o in off[k:]])
+    lo = lo[k:]
+    hi = hi[k:]
+    if _f:  # searching: the file was replaced, so follow it
+        _f.close()
+        _f = open(_io.history_file, 'rb')
+
+
+def _line(l):  # a history line (bytes) as the command typed
+    return l.split(b'\t', 1)[-1].decode('utf-8').strip()
+
+
+def _narrow(q, cands):  # the candidates whose signature has every bit of q's
+    m = _sig(q.encode('utf-8'))
+    return array('I', [i for i in cands if lo[i] & m[0] == m[0] and hi[i] & m[1] == m[1]])
+
+
+def _find(cur, skip=None):
+    # the newest real match at line cur or older; False (keeping the last one) if there is none
+    q = _st[0]
+    m = None
+    if not _f:
+        return False
+    if len(q) < 3:  # no trigram to narrow by: one pass through the file beats a seek for every line
+        qb = q.encode('utf-8')
+        _f.seek(0)
+        for i in range(min(cur + 1, len(off))):
+            l = _f.readline()
+            if qb in l:
+                t = _line(l)
+                if q in t and t != skip:
+                    m = (i, t)
+    else:
+        for i in _st[3]:  # newest first
+            if i <= cur:
+                _f.seek(off[i])
+                t = _line(_f.readline())
+                if q in t and t != skip:
+                    m = (i, t)
+                    break
+    if m:
+        _st[4], _st[5] = m
+    return bool(m)
+
+
+def _draw(fail=False):
+    f = 'failed ' if fail else ''
+    print(f"\0338({f}reverse-i-search)`{_st[0]}': {_st[5]}\033[K", end='')
+
+
+def start(io):
+    global _st, _io, _f
+    io.flush_hist()
+    if off is None:
+        build(io.history_file)
+    _io = io
+    try:
+        _f = open(io.history_file, 'rb')
+    except OSError:
+        _f = None
+    _st = ['', io._line, io._cursor_pos, range(len(off) - 1, -1, -1), 0, '']
+    if io._cursor_pos:
+        print(f'\033[{io._cursor_pos}D', end='')
+    print('\0337', end='')  # where the line starts: every redraw comes back here
+    _draw()
+
+
+def _end(line):
+    global _st, _io, _f
+    if _f:
+        _f.close()
+    print(f'\0338{line}\033[K', end='')
+    _io._line = line
+    _io._cursor_pos = len(line)
+    _io._rs = False
+    io = _io
+    _st = _io = _f = None
+    return io
+
+
+def key(io, c):  # one key while searching; returns what _process_input should
+    q = _st[0]
+    cur = _st[4] if _st[5] else len(off)
+    if c == '\x12':  # ^R again: the next older match
+        _draw(not _find(cur - 1, _st[5]))
+    elif c in '\x07\x03':  # ^G, ^C: back to the line as it was
+        line, pos = _st[1], _st[2]
+        io = _end(line)
+        if pos < len(line):
+            print(f'\033[{len(line) - pos}D', end='')
+        io._cursor_pos = pos
+    elif c >= ' ' or c == '\b':
+        if c in '\x7f\b':
+            q = q[:-1]
+            _st[3] = range(len(off) - 1, -1, -1)  # a shorter query: every line is a candidate again
+        else:
+            q += c  # a longer one only ever drops candidates
+        _st[0] = q
+        if len(q) > 2:
+            _st[3] = _narrow(q, _st[3])
+        _draw(not (_st[5] and q in _st[5]) and not _find(cur))  # the match stays while it still matches
+    else:  # Enter, Esc, ^A...: take the match, then let the key do what it does
+        return _end(_st[5] or _st[1])._process_input(c)
+
+
+def _block(io, pos):  # 512 bytes of the history file from pos; opened each time, as it may be appended to in between
+    with open(io.history_file, 'rb') as f:
+        f.seek(pos)
+        return f.read(512)
+
+
+def compact(io):
+    # background task: count the history file's lines and, if it is over a cap, cut it to 3/4 of the cap.
+    # One block per step; lines flushed meanwhile are copied in the last step, which does not yield
+    tmp = "/.history.tmp"
+    try:
+        n = pos = 0
+        while True:
+            b = _block(io, pos)
+            if not b:
+                break
+            n += b.count(b'\n')
+            pos += len(b)
+            yield
+        io._hn = n  # lines flushed while counting were read too
+        size = pos
+        if n <= io.hmax and size <= io.hbytes:
+            return
+        skip = n - io.hmax * 3 // 4 if n > io.hmax else 0  # lines to drop
+        least = size - io.hbytes * 3 // 4 if size > io.hbytes else 0  # and bytes, at least
+        pos = k = 0
+        at = None
+        while at is None:
+            b = _block(io, pos)
+            if not b:
+                return
+            i = 0
+            while at is None:
+                j = b.find(b'\n', i)
+                if j < 0:
+                    break
+                k += 1
+                i = j + 1
+                if k >= skip and pos + i >= least:
+                    at = pos + i
+            pos += len(b)
+            yield
+        pos = at
+        with open(tmp, 'wb') as t:
+            pass
+        while True:
+            b = _block(io, pos)
+            with open(tmp, 'ab') as t:
+                t.write(b)
+            pos += len(b)
+            if len(b) < 512:
+                break
+            yield
+        os.remove(io.history_file)
+        os.rename(tmp, io.history_file)
+        io._hn -= k
+        cut(k, at)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+    finally:
+        io._hc = False
+        if off is None and _st is None:  # no ^R index to keep: unload
+            sys.modules.pop('shhist', None)
@@ -0,0 +1,97 @@
+# shnet.py
+
+__version__ = '1.0.20240626'  # Major.Minor.Patch
+
+# Created by Chris Drake.
+# Linux-like shell interface for CircuitPython.  https://github.com/gitcnd/cpy_shell
+#
+# Networking state shared by the commands and the shell: one SocketPool, a DNS cache and idle
+# keep-alive connections.  Unlike the command modules this one stays loaded once imported.
+
+import time
+
+TTL = 300     # seconds a DNS answer is kept
+KEEP = 4      # idle connections kept open; sockets are scarce on these boards
+AGE = 15      # seconds an idle connection is trusted; servers time keep-alive out soon after
+
+_pool = None
+_ctx = None
+_dns = {}     # host: (ip, expiry)
+_idle = []    # [(proto, host, port), sock, time released], oldest first
+# errnos (Linux, then lwIP) of a non-blocking socket that is still connecting or can not take more yet
+PENDING = (11, 107, 110, 114, 115, 116, 119, 128)
+
+
+def pool():
+    global _pool
+    if _pool is None:
+        import socketpool
+        import wifi
+        _pool = socketpool.SocketPool(wifi.radio)
+    return _pool
+
+
+def addr(host):  # ip address of host, from the cache while it is fresh
+    e = _dns.get(host)
+    now = time.monotonic()
+    if e and e[1] > now:
+        return e[0]
+    ip = pool().getaddrinfo(host, 0)[0][4][0]
+    _dns[host] = (ip, now + TTL)
+    return ip
+
+
+def ctx():  # the one TLS context every https connection is wrapped with
+    global _ctx
+    if _ctx is None:
+        import ssl
+        _ctx = ssl.create_default_context()
+    return _ctx
+
+
+def connect(proto, host, port, timeout=10, fresh=False, nb=False):
+    # an idle connection to proto://host:port if there is one, else a new one; returns (sock, reused)
+    # fresh: a reused one just failed, so the others to this host are most likely dead too: close them all
+    # nb: a new http connection is only started; the caller's first send() tells when it is up (TLS has to wait for it)
+    key = (proto, host, port)
+    reap(fresh and key)
+    for i, e in enumerate(_idle):
+        if e[0] == key:
+            _idle.pop(i)
+            e[1].settimeout(timeout)
+            return e[1], True
+    p = pool()
+    s = p.socket(p.AF_INET, p.SOCK_STREAM)
+    try:
+        nb = nb and proto == 'http'
+        s.settimeout(0 if nb else timeout)
+        try:
+            s.connect((addr(host), port))
+        except OSError as e:
+            if not nb or e.errno not in PENDING:
+                raise
+        if proto == 'https':
+            s = ctx().wrap_socket(s, server_hostname=host)
+    except Exception:
+        s.close()
+        raise
+    return s, False
+
+
+def reap(key=None):  # close the idle connections older than AGE (and every one to key); the prompt calls this while it waits
+    old = time.monotonic() - AGE
+    for e in _idle[:]:
+        if e[2] < old or e[0] == key:
+            _idle.remove(e)
+            e[1].close()
+
+
+def release(proto, host, port, s):  # hand a connection back for the next request, after its response was read to the end
+    _idle.append(((proto, host, port), s, time.monotonic()))
+    while len(_idle) > KEEP:
+        _idle.pop(0)[1].close()
+
+
+def close():  # drop every idle connection
+    while _idle:
+        _idle.pop()[1].close()